@@ -0,0 +1,78 @@
+import uuid
+
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from public.cache import build_tiered_cache
+from .models import AuthUsers
+
+USER_STATE_FIELDS = ('username', 'email', 'is_active', 'is_superuser', 'deleted_at')
+
+user_state_cache = build_tiered_cache('auth_users')
+
+
+def load_user_state(user_id):
+    # An empty dict is cached for unknown ids so bad tokens don't hit the database either.
+    return AuthUsers.objects.filter(pk=user_id).values(*USER_STATE_FIELDS).first() or {}
+
+
+def invalidate_user_state(user_id):
+    user_state_cache.delete(user_id)
+
+
+class CachedTokenUser(TokenUser):
+    """
+    Lightweight request.user built from the token and the cached user state.
+    Use ``request.user.pk`` for lookups; it is not an ``AuthUsers`` instance.
+    """
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    @cached_property
+    def id(self):
+        return uuid.UUID(str(self.token[api_settings.USER_ID_CLAIM]))
+
+    @cached_property
+    def username(self):
+        return self.state['username']
+
+    @cached_property
+    def email(self):
+        return self.state['email']
+
+    @cached_property
+    def is_active(self):
+        return self.state['is_active']
+
+    @cached_property
+    def is_superuser(self):
+        return self.state['is_superuser']
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from a short-TTL cache instead of
+    loading AuthUsers on every request. Entries are dropped whenever an
+    AuthUsers row is saved or deleted (see custom_auth.signals).
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        state = user_state_cache.get_or_set(user_id, lambda: load_user_state(user_id))
+        if not state:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not state['is_active'] or state['deleted_at'] is not None:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return CachedTokenUser(validated_token, state)
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import hashing_pool, hash_password, ahash_password, verify_password
+
+UserModel = get_user_model()
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticates against the lower-cased email column with a single indexed
+    lookup, checking the password on the row it loaded. Hashing runs on the
+    shared hashing pool, and outdated hashes are upgraded on successful login.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get(email=normalize_email(email))
+        except (UserModel.DoesNotExist, UserModel.MultipleObjectsReturned):
+            # Run the default hasher once so unknown emails take as long as wrong passwords.
+            hash_password(password)
+            return None
+
+        valid, must_update = hashing_pool.call(verify_password, password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
+
+    async def aauthenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        try:
+            user = await UserModel._default_manager.aget(email=normalize_email(email))
+        except (UserModel.DoesNotExist, UserModel.MultipleObjectsReturned):
+            await ahash_password(password)
+            return None
+
+        valid, must_update = await hashing_pool.arun(verify_password, password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+
+        if must_update:
+            user.password = await ahash_password(password)
+            await user.asave(update_fields=['password'])
+        return user
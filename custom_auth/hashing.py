@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingPoolSaturated(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please retry shortly.'
+    default_code = 'hashing_pool_saturated'
+    wait = 1
+
+
+class HashingPool:
+    """
+    Runs password hashing off the request thread on a fixed number of workers.
+
+    At most ``max_workers + max_pending`` jobs may be in flight; beyond that
+    ``submit`` raises ``HashingPoolSaturated`` instead of queueing without bound.
+    PBKDF2 releases the GIL inside hashlib, so threads give real parallelism.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+def verify_password(raw_password, encoded):
+    """
+    Return ``(valid, must_update)`` without touching the database, mirroring
+    Django's check_password() rehash rule so callers can save a new hash.
+    """
+    if not check_password(raw_password, encoded):
+        return False, False
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    must_update = hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+    return True, must_update
+
+
+hashing_pool = HashingPool(**getattr(settings, 'PASSWORD_HASHING_POOL', {}))
+
+
+def hash_password(raw_password):
+    return hashing_pool.call(make_password, raw_password)
+
+
+async def ahash_password(raw_password):
+    return await hashing_pool.arun(make_password, raw_password)
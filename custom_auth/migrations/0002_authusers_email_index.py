@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    AuthUsers = apps.get_model('custom_auth', 'AuthUsers')
+    # Lower-casing addresses that differ only by case would leave two accounts
+    # on one email, and EmailBackend refuses ambiguous lookups. Those must be
+    # merged or renamed by hand first.
+    duplicates = list(
+        AuthUsers.objects.exclude(email='').annotate(normalized=Lower('email'))
+        .values('normalized').annotate(accounts=Count('id')).filter(accounts__gt=1)
+        .order_by('normalized').values_list('normalized', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Cannot lower-case AuthUsers.email: these addresses belong to more than '
+            'one account when compared case-insensitively: %s' % ', '.join(duplicates)
+        )
+    AuthUsers.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='authusers',
+            index=models.Index(fields=['email'], name='users_email_idx'),
+        ),
+    ]
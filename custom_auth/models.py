@@ -21,6 +21,7 @@ class AuthUsers(AbstractUser):
         indexes = [
             models.Index(fields=['id'], name='users_instance_id_idx'),
             models.Index(fields=['is_sso_user'], name='users_is_sso_user_idx'),
+            models.Index(fields=['email'], name='users_email_idx'),
         ]
  
     def __str__(self):
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import AuthUsers
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from .backends import normalize_email
+from .hashing import hash_password
 
 class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,41 +13,53 @@ class RegisterSerializer(serializers.ModelSerializer):
             'password': {'write_only': True}
         }
 
+    def validate_email(self, value):
+        # Checked on the normalized value, which is what gets stored
+        email = normalize_email(value)
+        if email and AuthUsers.objects.filter(email=email).exists():
+            raise serializers.ValidationError("A user with that email already exists.")
+        return email
+
     def create(self, validated_data):
-        validated_data['password'] = make_password(validated_data['password'])
+        # The async register view hashes on the pool itself and passes the result in context
+        encoded = self.context.get('encoded_password')
+        validated_data['password'] = encoded or hash_password(validated_data['password'])
         return super().create(validated_data)
 
-class LoginSerializer(serializers.Serializer):
+
+def login_payload(user):
+    tokens = RefreshToken.for_user(user)
+    return {
+        "access": str(tokens.access_token),
+        "refresh": str(tokens),
+        "user": {
+            "id": str(user.id),
+            "username": user.username,
+            "email": user.email,
+        }
+    }
+
+
+class LoginCredentialsSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
+
+class LoginSerializer(LoginCredentialsSerializer):
+
     def validate(self, data):
         email = data.get('email')
         password = data.get('password')
 
         if email and password:
-            try:
-                user = AuthUsers.objects.get(email=email)
-            except AuthUsers.DoesNotExist:
-                raise serializers.ValidationError("Invalid email or password")
-
-            # Authenticate using username fetched from the user instance
-            user = authenticate(username=user.username, password=password)
+            # EmailBackend loads the user by email and checks the password in one lookup
+            user = authenticate(self.context.get('request'), email=email, password=password)
             if not user:
                 raise serializers.ValidationError("Invalid email or password")
 
             if not user.is_active:
                 raise serializers.ValidationError("User is inactive")
 
-            tokens = RefreshToken.for_user(user)
-            return {
-                "access": str(tokens.access_token),
-                "refresh": str(tokens),
-                "user": {
-                    "id": str(user.id),
-                    "username": user.username,
-                    "email": user.email,
-                }
-            }
+            return login_payload(user)
 
         raise serializers.ValidationError("Both email and password are required")
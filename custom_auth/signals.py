@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_state
+from .models import AuthUsers
+
+
+@receiver(post_save, sender=AuthUsers)
+@receiver(post_delete, sender=AuthUsers)
+def drop_cached_user_state(sender, instance, **kwargs):
+    # QuerySet.update() bypasses this; callers changing is_active/deleted_at in bulk must invalidate themselves.
+    invalidate_user_state(instance.pk)
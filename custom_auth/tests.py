@@ -1,3 +1,106 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import authenticate
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication
+from .models import AuthUsers
+from .serializers import RegisterSerializer
+
+email_migration = import_module('custom_auth.migrations.0002_authusers_email_index')
+
+
+def make_user(username, email, password='secret-pass'):
+    user = AuthUsers(username=username, email=email)
+    user.set_password(password)
+    user.save()
+    return user
+
+
+class EmailBackendTests(TestCase):
+    def test_login_ignores_email_case_and_whitespace(self):
+        user = make_user('amina', 'amina@example.com')
+        self.assertEqual(authenticate(None, email='  Amina@Example.COM ', password='secret-pass'), user)
+
+    def test_wrong_password_and_unknown_email_fail(self):
+        make_user('amina', 'amina@example.com')
+        self.assertIsNone(authenticate(None, email='amina@example.com', password='wrong'))
+        self.assertIsNone(authenticate(None, email='nobody@example.com', password='secret-pass'))
+
+
+class RegisterSerializerTests(TestCase):
+    def test_email_is_stored_normalized(self):
+        serializer = RegisterSerializer(data={'username': 'yusuf', 'email': ' Yusuf@Example.com', 'password': 'p4ss'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().email, 'yusuf@example.com')
+
+    def test_case_variant_of_existing_email_is_rejected(self):
+        make_user('yusuf', 'yusuf@example.com')
+        serializer = RegisterSerializer(data={'username': 'yusuf2', 'email': 'YUSUF@example.com', 'password': 'p4ss'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+
+class LowercaseEmailsMigrationTests(TestCase):
+    def test_lowercases_existing_emails(self):
+        make_user('maryam', 'Maryam@Example.com')
+        email_migration.lowercase_emails(apps, None)
+        self.assertEqual(AuthUsers.objects.get(username='maryam').email, 'maryam@example.com')
+
+    def test_refuses_case_duplicates(self):
+        make_user('maryam', 'Maryam@Example.com')
+        make_user('maryam2', 'maryam@example.com')
+        with self.assertRaisesMessage(RuntimeError, 'maryam@example.com'):
+            email_migration.lowercase_emails(apps, None)
+        self.assertEqual(AuthUsers.objects.filter(email='Maryam@Example.com').count(), 1)
+
+
+def authenticate_token(token):
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    return CachedJWTAuthentication().authenticate(request)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = make_user('hafsa', 'hafsa@example.com')
+        self.token = AccessToken.for_user(self.user)
+
+    def test_cache_hit_runs_no_queries(self):
+        with self.assertNumQueries(1):
+            authenticate_token(self.token)
+        with self.assertNumQueries(0):
+            request_user, _ = authenticate_token(self.token)
+        self.assertEqual(request_user.pk, self.user.pk)
+
+    def test_request_user_exposes_the_fields_views_read(self):
+        request_user, _ = authenticate_token(self.token)
+        self.assertEqual(
+            (request_user.id, request_user.username, request_user.email, request_user.is_active, request_user.is_superuser),
+            (self.user.pk, 'hafsa', 'hafsa@example.com', True, False),
+        )
+        self.assertTrue(request_user.is_authenticated)
+
+    def test_deactivating_or_soft_deleting_invalidates_the_cache(self):
+        for field, value in (('is_active', False), ('deleted_at', timezone.now())):
+            with self.subTest(field=field):
+                user = make_user(f'user-{field}', f'{field}@example.com')
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+                self.assertEqual(client.get('/public/user_preferences/').status_code, 200)
+
+                setattr(user, field, value)
+                user.save()
+                self.assertEqual(client.get('/public/user_preferences/').status_code, 401)
 
-# Create your tests here.
+    def test_unknown_and_deleted_users_are_rejected(self):
+        with self.assertRaises(AuthenticationFailed):
+            authenticate_token(AccessToken.for_user(AuthUsers(username='ghost', email='ghost@example.com')))
+        authenticate_token(self.token)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            authenticate_token(self.token)
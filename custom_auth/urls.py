@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import LoginView, RegisterView
+from .views import LoginView, RegisterView, LoginAsyncView, RegisterAsyncView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
-    path('login/', LoginView.as_view(), name='login')
+    path('login/', LoginView.as_view(), name='login'),
+    path('register/async/', RegisterAsyncView.as_view(), name='register_async'),
+    path('login/async/', LoginAsyncView.as_view(), name='login_async'),
 ]
@@ -1,8 +1,17 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from .backends import EmailBackend
+from .hashing import HashingPoolSaturated, ahash_password
 from .serializers import RegisterSerializer
-from .serializers import LoginSerializer
+from .serializers import LoginSerializer, LoginCredentialsSerializer, login_payload
 
 class RegisterView(APIView):
     def post(self, request):
@@ -18,7 +27,67 @@ class RegisterView(APIView):
 
 class LoginView(APIView):
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)        
+        serializer = LoginSerializer(data=request.data, context={'request': request})        
         if serializer.is_valid():
             return Response(serializer.validated_data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Async variants for the ASGI deployment (myDuaaApp/asgi.py). Password hashing
+# runs on the bounded hashing pool while the event loop keeps serving requests.
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+def _saturated_response(exc):
+    return JsonResponse(
+        {"detail": str(exc.detail)},
+        status=exc.status_code,
+        headers={"Retry-After": str(exc.wait)},
+    )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RegisterAsyncView(View):
+    async def post(self, request):
+        data = _json_body(request)
+        if data is None:
+            return JsonResponse({"detail": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = RegisterSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            serializer.context['encoded_password'] = await ahash_password(serializer.validated_data['password'])
+        except HashingPoolSaturated as exc:
+            return _saturated_response(exc)
+
+        await sync_to_async(serializer.save)()
+        return JsonResponse({"message": "User registered successfully"}, status=status.HTTP_201_CREATED)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LoginAsyncView(View):
+    async def post(self, request):
+        data = _json_body(request)
+        if data is None:
+            return JsonResponse({"detail": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = LoginCredentialsSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await EmailBackend().aauthenticate(request, **serializer.validated_data)
+        except HashingPoolSaturated as exc:
+            return _saturated_response(exc)
+
+        if not user:
+            return JsonResponse({"non_field_errors": ["Invalid email or password"]}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse(login_payload(user), status=status.HTTP_200_OK)
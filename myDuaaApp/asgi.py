@@ -2,6 +2,10 @@
 ASGI config for myDuaaApp project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django as usual (including the async auth views in
+custom_auth.views); WebSocket connections are routed by Channels to the
+consumers in public.routing. Serve with an ASGI server, e.g.
+``daphne myDuaaApp.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -13,4 +17,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myDuaaApp.settings')
 
-application = get_asgi_application()
+# Initialize Django before importing anything that touches models.
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from public.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': URLRouter(websocket_urlpatterns),
+})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,12 @@ INSTALLED_APPS = [
     'custom_auth',
     'public',
     'corsheaders',
+    'channels',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'custom_auth.authentication.CachedJWTAuthentication',
     )
 }
 
@@ -79,6 +81,30 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myDuaaApp.wsgi.application'
+ASGI_APPLICATION = 'myDuaaApp.asgi.application'
+
+# In-memory layer works for a single process; use channels_redis.core.RedisChannelLayer across nodes.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+# public.chat.MessageBatcher: flush incoming group chat messages every N messages or T seconds
+GROUP_CHAT_BATCHING = {
+    'max_batch': 200,
+    'max_delay': 0.25,
+}
+
+GROUP_LEADERBOARDS = {
+    'max_groups': 5000,
+    'timeout': 300,
+}
+
+QURAN_METADATA = {
+    'check_interval': 60,
+    'max_age': 86400,
+}
 
 
 # Database
@@ -98,6 +124,45 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local-memory stand-in; point 'default' at Redis/Memcached when running several nodes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'duaa-default',
+    }
+}
+
+# Per-namespace options for public.cache.TieredCache (shared alias/TTL plus local LRU size/TTL)
+TIERED_CACHES = {
+    'user_preferences': {
+        'alias': 'default',
+        'timeout': 300,
+        'local_maxsize': 10000,
+        'local_timeout': 30,
+    },
+    'auth_users': {
+        'alias': 'default',
+        'timeout': 60,
+        'local_maxsize': 50000,
+        'local_timeout': 10,
+    },
+    'prayer_rewards': {
+        'alias': 'default',
+        'timeout': 24 * 3600,
+        'local_maxsize': 1,
+        'local_timeout': 60,
+    },
+    'group_invites': {
+        'alias': 'default',
+        'timeout': 600,
+        'local_maxsize': 5000,
+        'local_timeout': 30,
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -117,6 +182,14 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Bounded pool used by custom_auth.hashing for PBKDF2 work; requests beyond
+# max_workers + max_pending in flight get a 503 instead of queueing.
+PASSWORD_HASHING_POOL = {
+    'max_workers': 4,
+    'max_pending': 32,
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -141,6 +214,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'custom_auth.AuthUsers'
 
+AUTHENTICATION_BACKENDS = [
+    'custom_auth.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 #Needs to update for production
 CORS_ALLOW_ALL_ORIGINS = True 
 CORS_ALLOW_CREDENTIALS = True
+
+# Web Push (VAPID) settings for public.push.PushEngine. VAPID_PRIVATE_KEY is
+# a PEM key or the base64url-encoded raw P-256 scalar.
+WEB_PUSH = {
+    'VAPID_PRIVATE_KEY': os.environ.get('VAPID_PRIVATE_KEY', ''),
+    'VAPID_SUBJECT': os.environ.get('VAPID_SUBJECT', 'mailto:admin@example.com'),
+    'TTL': 3600,
+    'MAX_PER_HOST': 100,
+    'MAX_RETRIES': 3,
+    'HTTP2': True,
+}
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import parse_etags
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=10000, timeout=30):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    """
+    Two-level cache: a short-lived local LRU in front of a Django cache alias.
+
+    The local tier only absorbs repeat hits inside one worker, so its TTL is
+    kept short; the shared tier is what invalidation is authoritative for.
+    """
+
+    def __init__(self, prefix, alias='default', timeout=300, local_maxsize=10000, local_timeout=30):
+        self.prefix = prefix
+        self.alias = alias
+        self.timeout = timeout
+        self.local = LRUCache(maxsize=local_maxsize, timeout=local_timeout)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key, default=None):
+        key = self.make_key(key)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is None:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        key = self.make_key(key)
+        self.shared.set(key, value, self.timeout)
+        self.local.set(key, value)
+
+    def delete(self, key):
+        key = self.make_key(key)
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    def get_or_set(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+
+def is_process_local(cache):
+    """True for backends whose entries other worker processes cannot see."""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+def make_etag(data):
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return '"%s"' % hashlib.sha256(payload.encode()).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def build_tiered_cache(name):
+    options = getattr(settings, 'TIERED_CACHES', {}).get(name, {})
+    return TieredCache(name, **options)
+
+
+preference_cache = build_tiered_cache('user_preferences')
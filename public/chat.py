@@ -0,0 +1,149 @@
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, DataError, IntegrityError, transaction
+
+from .cache import LRUCache
+from .models import GroupChatMessage
+
+logger = logging.getLogger(__name__)
+
+REPLY_PREVIEW_LENGTH = 120
+
+
+def group_channel_name(group_id):
+    return f'group_chat_{group_id}'
+
+
+def make_reply_preview(content):
+    content = ' '.join(content.split())
+    if len(content) <= REPLY_PREVIEW_LENGTH:
+        return content
+    return content[:REPLY_PREVIEW_LENGTH - 1] + '…'
+
+
+# (group id, message id) -> reply preview for recent messages, so replies
+# rarely need a lookup. Keyed by group too, so a reply can only quote a
+# message from its own group.
+recent_previews = LRUCache(maxsize=50000, timeout=3600)
+
+
+def _preview_key(group_id, message_id):
+    return str(group_id), str(message_id)
+
+
+@database_sync_to_async
+def _load_reply_preview(group_id, message_id):
+    content = (
+        GroupChatMessage.objects
+        .filter(pk=message_id, group_id=group_id)
+        .values_list('message_content', flat=True)
+        .first()
+    )
+    return make_reply_preview(content) if content is not None else None
+
+
+async def reply_preview_for(group_id, message_id):
+    preview = recent_previews.get(_preview_key(group_id, message_id))
+    if preview is None:
+        preview = await _load_reply_preview(group_id, message_id)
+    return preview
+
+
+def save_messages(batch):
+    """
+    bulk_create ``batch``; if that fails, insert the messages one by one so a
+    single bad row does not drop messages that clients have already been
+    sent. Each insert runs in its own savepoint, so a failed bulk insert
+    leaves nothing half-written. Rows the database rejects are logged and
+    dropped; messages that hit any other database error are returned so the
+    caller can retry them.
+    """
+    try:
+        with transaction.atomic():
+            GroupChatMessage.objects.bulk_create(batch)
+        return []
+    except DatabaseError:
+        logger.exception('Bulk insert of %d chat messages failed; retrying one by one', len(batch))
+    failed = []
+    for message in batch:
+        try:
+            with transaction.atomic():
+                message.save(force_insert=True)
+        except (IntegrityError, DataError):
+            logger.exception('Dropped chat message %s for group %s', message.id, message.group_id_id)
+        except DatabaseError:
+            failed.append(message)
+    return failed
+
+
+class MessageBatcher:
+    """
+    Buffers incoming chat messages and writes them with one bulk_create per
+    ``max_batch`` messages or ``max_delay`` seconds, whichever comes first.
+    Flushes are serialized so a reply is never inserted before its parent.
+    Messages a flush could not store go back to the front of the buffer and
+    are retried with the next flush, up to ``max_attempts`` flushes.
+    """
+
+    def __init__(self, max_batch=200, max_delay=0.25, max_attempts=5):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._pending = []
+        self._attempts = {}
+        self._timer = None
+        self._lock = None
+
+    async def add(self, message):
+        recent_previews.set(
+            _preview_key(message.group_id_id, message.id), make_reply_preview(message.message_content),
+        )
+        self._pending.append(message)
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                failed = await database_sync_to_async(save_messages)(batch)
+            except Exception:
+                logger.exception('Flush of %d chat messages failed', len(batch))
+                failed = batch
+            failed_ids = {message.id for message in failed}
+            for message in batch:
+                if message.id not in failed_ids:
+                    self._attempts.pop(message.id, None)
+            self._requeue(failed)
+
+    def _requeue(self, failed):
+        retry = []
+        for message in failed:
+            attempts = self._attempts[message.id] = self._attempts.get(message.id, 0) + 1
+            if attempts < self.max_attempts:
+                retry.append(message)
+            else:
+                self._attempts.pop(message.id)
+                logger.error('Dropped chat message %s for group %s after %d attempts',
+                             message.id, message.group_id_id, attempts)
+        if retry:
+            self._pending[:0] = retry
+            if self._timer is None:
+                self._timer = asyncio.ensure_future(self._flush_later())
+
+
+message_batcher = MessageBatcher(**getattr(settings, 'GROUP_CHAT_BATCHING', {}))
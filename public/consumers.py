@@ -0,0 +1,98 @@
+import uuid
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from custom_auth.authentication import CachedJWTAuthentication
+from .chat import group_channel_name, message_batcher, reply_preview_for
+from .models import GroupChatMessage, GroupChatParticipant
+
+
+@database_sync_to_async
+def authenticate_token(raw_token):
+    auth = CachedJWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+@database_sync_to_async
+def is_participant(group_id, user_id):
+    return GroupChatParticipant.objects.filter(group_id=group_id, user_id=user_id).exists()
+
+
+class GroupChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/groups/<group_id>/chat/?token=<access token>
+
+    Incoming: {"message": "...", "reply_to": "<message id>"?}
+    Outgoing: {"type": "message", "message": {...}}
+
+    Each message is fanned out once through the channel layer group and
+    written later in a batch by ``message_batcher``; listeners never query.
+    """
+
+    async def connect(self):
+        self.group_id = self.scope['url_route']['kwargs']['group_id']
+        token = parse_qs(self.scope['query_string'].decode()).get('token', [None])[0]
+        self.user = await authenticate_token(token) if token else None
+
+        if self.user is None or not await is_participant(self.group_id, self.user.pk):
+            await self.close(code=4403)
+            return
+
+        self.channel_group = group_channel_name(self.group_id)
+        await self.channel_layer.group_add(self.channel_group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'channel_group'):
+            await self.channel_layer.group_discard(self.channel_group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        text = (content.get('message') or '').strip()
+        if not text:
+            await self.send_json({'type': 'error', 'detail': 'message is required'})
+            return
+
+        reply_to = content.get('reply_to')
+        try:
+            reply_to = uuid.UUID(reply_to) if reply_to else None
+        except ValueError:
+            reply_to = None
+        preview = await reply_preview_for(self.group_id, reply_to) if reply_to else None
+        if preview is None:
+            reply_to = None
+
+        now = timezone.now()
+        message = GroupChatMessage(
+            id=uuid.uuid4(),
+            group_id_id=self.group_id,
+            user_id=self.user.pk,
+            message_content=text,
+            created_at=now,
+            updated_at=now,
+            replied_to_message_id=reply_to,
+            reply_preview=preview,
+        )
+        await message_batcher.add(message)
+        await self.channel_layer.group_send(self.channel_group, {
+            'type': 'chat.message',
+            'message': {
+                'id': str(message.id),
+                'group_id': str(self.group_id),
+                'user_id': str(message.user_id),
+                'message_content': message.message_content,
+                'created_at': now.isoformat(),
+                'replied_to_message': str(reply_to) if reply_to else None,
+                'reply_preview': preview,
+            },
+        })
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
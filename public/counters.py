@@ -0,0 +1,43 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import CommunityComment, CommunityPost, CommunityReaction, PrayerSupport
+
+# counter column -> (child model, FK field pointing at CommunityPost)
+POST_COUNTERS = {
+    'reaction_count': (CommunityReaction, 'post_id'),
+    'comment_count': (CommunityComment, 'post'),
+    'support_count': (PrayerSupport, 'post_id'),
+}
+
+
+def count_per_post(model, post_field):
+    counts = (
+        model.objects.filter(**{post_field: OuterRef('pk')})
+        .order_by()
+        .values(post_field)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile_post_counters(post_ids=None):
+    """
+    Recompute drifted counters with one set-based UPDATE per counter, touching
+    only rows whose stored value differs from the real count. Returns the
+    number of rows fixed per counter.
+    """
+    fixed = {}
+    posts = CommunityPost.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+
+    for counter, (model, post_field) in POST_COUNTERS.items():
+        actual = count_per_post(model, post_field)
+        fixed[counter] = (
+            posts.annotate(actual=actual)
+            .exclude(**{counter: F('actual')})
+            .update(**{counter: actual})
+        )
+    return fixed
@@ -0,0 +1,121 @@
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import build_tiered_cache
+from .leaderboards import leaderboard_index
+from .models import AccountabilityGroup, ChallengeGroupMember, GroupChatParticipant, GroupJoinRequest
+
+invite_cache = build_tiered_cache('group_invites')
+
+INVITE_FIELDS = ['id', 'name', 'description', 'group_type', 'daily_target_pages', 'member_count']
+
+
+def load_group_by_invite(invite_code):
+    group = AccountabilityGroup.objects.filter(invite_code=invite_code).values(*INVITE_FIELDS).first()
+    # Unknown codes are cached too (as {}); creating a group clears its code
+    return group or {}
+
+
+def group_by_invite_code(invite_code):
+    """Public summary of the group behind ``invite_code``, or None."""
+    return invite_cache.get_or_set(invite_code, lambda: load_group_by_invite(invite_code)) or None
+
+
+def invalidate_invite_code(invite_code):
+    invite_cache.delete(invite_code)
+
+
+def _bulk_insert_missing(model, rows, key_fields):
+    """bulk_create the ``rows`` whose ``key_fields`` values are not stored yet."""
+    if not rows:
+        return 0
+    attnames = [model._meta.get_field(name).attname for name in key_fields]
+    keys = [tuple(getattr(row, attname) for attname in attnames) for row in rows]
+    stored = set(model.objects.filter(**{
+        f'{name}__in': {key[i] for key in keys} for i, name in enumerate(key_fields)
+    }).values_list(*key_fields))
+    rows = [row for row, key in zip(rows, keys) if key not in stored]
+    model.objects.bulk_create(rows, ignore_conflicts=connection.features.supports_ignore_conflicts)
+    return len(rows)
+
+
+def refresh_member_counts(group_ids):
+    """Recompute member_count for ``group_ids`` in a single UPDATE."""
+    members = (
+        ChallengeGroupMember.objects.filter(group_id=OuterRef('pk'))
+        .order_by().values('group_id').annotate(total=Count('id')).values('total')
+    )
+    return AccountabilityGroup.objects.filter(pk__in=group_ids).update(
+        member_count=Coalesce(Subquery(members), Value(0)),
+        updated_at=timezone.now(),
+    )
+
+
+def admin_group_ids(user_id, group_ids):
+    """The subset of ``group_ids`` that ``user_id`` may review requests for."""
+    owned = AccountabilityGroup.objects.filter(pk__in=group_ids, created_by=user_id).values_list('pk', flat=True)
+    admin = ChallengeGroupMember.objects.filter(
+        group_id__in=group_ids, user_id=user_id, is_admin=True,
+    ).values_list('group_id', flat=True)
+    return set(owned) | set(admin)
+
+
+def review_join_requests(reviewer_id, request_ids, approve):
+    """
+    Approve or reject pending join requests in one transaction.
+
+    Requests are locked and updated with one bulk_update; on approval the
+    memberships and chat participants are added with one bulk_create each,
+    and member_count is recomputed once for all touched groups. Requests
+    that are not pending or belong to groups the reviewer does not manage
+    are returned as skipped.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = list(
+            GroupJoinRequest.objects.select_for_update()
+            .filter(pk__in=request_ids, status='pending')
+            .select_related('group_id')
+        )
+        allowed = admin_group_ids(reviewer_id, {request.group_id_id for request in pending})
+        reviewed = [request for request in pending if request.group_id_id in allowed]
+
+        for request in reviewed:
+            request.status = 'approved' if approve else 'rejected'
+            request.reviewed_at = now
+            request.reviewed_by_id = reviewer_id
+        GroupJoinRequest.objects.bulk_update(reviewed, ['status', 'reviewed_at', 'reviewed_by'])
+
+        group_ids = {request.group_id_id for request in reviewed}
+        if approve and reviewed:
+            _bulk_insert_missing(ChallengeGroupMember, [
+                ChallengeGroupMember(
+                    group_id=request.group_id_id,
+                    user_id=request.user_id_id,
+                    daily_target_pages=request.group_id.daily_target_pages,
+                )
+                for request in reviewed
+            ], ('group_id', 'user'))
+            _bulk_insert_missing(GroupChatParticipant, [
+                GroupChatParticipant(group_id_id=request.group_id_id, user_id=request.user_id_id, joined_at=now)
+                for request in reviewed
+            ], ('group_id', 'user_id'))
+            refresh_member_counts(group_ids)
+
+            invite_codes = {request.group_id.invite_code for request in reviewed}
+
+            def clear_caches():
+                for group_id in group_ids:
+                    leaderboard_index.invalidate(group_id)
+                for invite_code in invite_codes:
+                    invalidate_invite_code(invite_code)
+
+            transaction.on_commit(clear_caches)
+
+    reviewed_ids = {request.pk for request in reviewed}
+    return {
+        'reviewed': [request.pk for request in reviewed],
+        'skipped': [request_id for request_id in request_ids if request_id not in reviewed_ids],
+    }
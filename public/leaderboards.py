@@ -0,0 +1,185 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Avg, Count, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from sortedcontainers import SortedList
+
+from .cache import LRUCache
+from .models import AccountabilityGroup, ChallengeGroupMember, UserReadingStat
+
+ORDERINGS = ('streak', 'pages')
+
+
+def _score(by, streak, pages):
+    # Negated so ascending order is best-first; the other metric breaks ties
+    return (-streak, -pages) if by == 'streak' else (-pages, -streak)
+
+
+class GroupLeaderboard:
+    """
+    One group's rankings, kept as a SortedList per ordering of
+    ``(score..., user_id)`` tuples, so updates, rank lookups and the start of
+    a top-k read are all O(log n). Ties share a rank (1, 2, 2, 4).
+    """
+    __slots__ = ('group_id', 'stats', 'rankings', 'streak_total')
+
+    def __init__(self, group_id, members=()):
+        self.group_id = group_id
+        self.stats = {}
+        self.rankings = {by: SortedList() for by in ORDERINGS}
+        self.streak_total = 0
+        for user_id, streak, pages in members:
+            self.update(user_id, streak, pages)
+
+    def update(self, user_id, streak, pages):
+        streak, pages = streak or 0, pages or 0
+        self.remove(user_id)
+        self.stats[user_id] = (streak, pages)
+        self.streak_total += streak
+        for by, ranking in self.rankings.items():
+            ranking.add(_score(by, streak, pages) + (user_id,))
+
+    def remove(self, user_id):
+        previous = self.stats.pop(user_id, None)
+        if previous is None:
+            return
+        self.streak_total -= previous[0]
+        for by, ranking in self.rankings.items():
+            ranking.remove(_score(by, *previous) + (user_id,))
+
+    def rank(self, user_id, by='streak'):
+        if user_id not in self.stats:
+            return None
+        # Entries with a strictly better score sort before the bare score tuple
+        return self.rankings[by].bisect_left(_score(by, *self.stats[user_id])) + 1
+
+    def top(self, k, by='streak'):
+        """``[(rank, user_id, streak, pages), ...]`` for the best ``k`` members."""
+        rows, rank, previous = [], 0, None
+        for i, entry in enumerate(self.rankings[by].islice(0, k)):
+            score, user_id = entry[:2], entry[2]
+            if score != previous:
+                rank, previous = i + 1, score
+            rows.append((rank, user_id) + self.stats[user_id])
+        return rows
+
+    @property
+    def member_count(self):
+        return len(self.stats)
+
+    @property
+    def average_streak(self):
+        return round(self.streak_total / len(self.stats)) if self.stats else 0
+
+
+class LeaderboardIndex:
+    """
+    Process-local leaderboards for recently viewed groups. A group is loaded
+    with one query on first use and then kept current by ``refresh_user``
+    on progress events in this process; the TTL bounds drift from events
+    handled by other workers.
+    """
+
+    def __init__(self, max_groups=5000, timeout=300):
+        self.boards = LRUCache(maxsize=max_groups, timeout=timeout)
+        self.user_groups = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def load(self, group_id):
+        members = ChallengeGroupMember.objects.filter(group_id=group_id).values_list(
+            'user_id', 'user__user_reading_stats__current_streak', 'user__user_reading_stats__total_pages_read',
+        )
+        return GroupLeaderboard(group_id, members)
+
+    def get(self, group_id):
+        board = self.boards.get(group_id)
+        if board is None:
+            board = self.load(group_id)
+            with self._lock:
+                self.boards.set(group_id, board)
+                for user_id in board.stats:
+                    self.user_groups[user_id].add(group_id)
+        return board
+
+    def invalidate(self, group_id):
+        self.boards.delete(group_id)
+
+    def refresh_user(self, user_id):
+        """Re-read one user's stats into every loaded board they belong to."""
+        group_ids = self.user_groups.get(user_id)
+        if not group_ids:
+            return
+        boards = []
+        with self._lock:
+            for group_id in list(group_ids):
+                board = self.boards.get(group_id)
+                if board is None or user_id not in board.stats:
+                    group_ids.discard(group_id)
+                else:
+                    boards.append(board)
+            if not group_ids:
+                self.user_groups.pop(user_id, None)
+        if not boards:
+            return
+
+        streak, pages = UserReadingStat.objects.filter(user_id=user_id).values_list(
+            'current_streak', 'total_pages_read',
+        ).first() or (0, 0)
+        with self._lock:
+            for board in boards:
+                board.update(user_id, streak, pages)
+
+    def ranking(self, group_id, user_id, by='streak', limit=10):
+        board = self.get(group_id)
+        with self._lock:
+            return {
+                'top': board.top(limit, by),
+                'rank': board.rank(user_id, by),
+                'stats': board.stats.get(user_id),
+                'member_count': board.member_count,
+                'average_streak': board.average_streak,
+            }
+
+
+leaderboard_index = LeaderboardIndex(**getattr(settings, 'GROUP_LEADERBOARDS', {}))
+
+
+def write_back_group_stats(batch_size=1000):
+    """
+    Recompute AccountabilityGroup.member_count and average_streak from
+    ChallengeGroupMember/UserReadingStat with one GROUP BY per batch of
+    groups, and bulk_update the groups whose values changed.
+    Returns the number of groups updated.
+    """
+    groups = AccountabilityGroup.objects.order_by('id').only('id', 'member_count', 'average_streak')
+    last_id, updated = None, 0
+    while True:
+        page = groups.filter(id__gt=last_id) if last_id else groups
+        batch = list(page[:batch_size])
+        if not batch:
+            return updated
+        last_id = batch[-1].id
+
+        totals = {
+            row['group_id']: row
+            for row in ChallengeGroupMember.objects.filter(group_id__in=[g.id for g in batch])
+            .values('group_id')
+            .annotate(
+                members=Count('id'),
+                streak=Avg(Coalesce('user__user_reading_stats__current_streak', Value(0))),
+            )
+            .order_by()
+        }
+        now = timezone.now()
+        changed = []
+        for group in batch:
+            row = totals.get(group.id, {'members': 0, 'streak': 0})
+            member_count, average_streak = row['members'], round(row['streak'] or 0)
+            if (group.member_count, group.average_streak) != (member_count, average_streak):
+                group.member_count, group.average_streak, group.updated_at = member_count, average_streak, now
+                changed.append(group)
+        AccountabilityGroup.objects.bulk_update(changed, ['member_count', 'average_streak', 'updated_at'])
+        updated += len(changed)
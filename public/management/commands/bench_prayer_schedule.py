@@ -0,0 +1,40 @@
+import random
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from public.notifications import build_prayer_schedules
+from public.prayer_times import prayer_times_utc
+
+
+class Command(BaseCommand):
+    help = 'Benchmark building prayer reminder rows per location bucket versus per user (no database writes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--locations', type=int, default=10_000)
+        parser.add_argument('--sample', type=int, default=50_000,
+                            help='Users to time for the per-user baseline, extrapolated to --users.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        locations = [(round(rng.uniform(-55, 60), 1), round(rng.uniform(-180, 180), 1)) for _ in range(options['locations'])]
+        rows = [(uuid.uuid4(), *rng.choice(locations)) for _ in range(options['users'])]
+        day = date.today()
+
+        sample = rows[:options['sample']]
+        started = time.perf_counter()
+        for _ in build_prayer_schedules(sample, day, calculate=prayer_times_utc.__wrapped__):
+            pass
+        per_user = (time.perf_counter() - started) / len(sample) * len(rows)
+
+        prayer_times_utc.cache_clear()
+        started = time.perf_counter()
+        count = sum(1 for _ in build_prayer_schedules(rows, day))
+        bucketed = time.perf_counter() - started
+        calculations = prayer_times_utc.cache_info().misses
+
+        self.stdout.write(f'per-user (extrapolated):  {per_user:8.2f} s, {len(rows)} calculations')
+        self.stdout.write(f'per-bucket (memoized):    {bucketed:8.2f} s, {calculations} calculations, {count} rows')
@@ -0,0 +1,62 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from custom_auth.models import AuthUsers
+from public.models import UserPreference
+from public.serializers import UserPreferenceSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare the select-then-save preference flow with the single-statement upsert. Changes are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def legacy_flow(self, user, data):
+        try:
+            preference = UserPreference.objects.get(user=user)
+            serializer = UserPreferenceSerializer(preference, data=data, partial=True)
+        except UserPreference.DoesNotExist:
+            serializer = UserPreferenceSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=user)
+
+    def upsert_flow(self, user, data):
+        serializer = UserPreferenceSerializer(data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        UserPreference.objects.upsert(user, **serializer.validated_data)
+
+    def run(self, label, flow, users):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for i, user in enumerate(users):
+                flow(user, {'daily_quran_goal': i % 10, 'onboarding_completed': True})
+            elapsed = time.perf_counter() - started
+        per_call = elapsed / len(users) * 1000
+        self.stdout.write(f'{label:<8} {per_call:8.3f} ms/call  {len(queries) / len(users):.1f} queries/call')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        try:
+            with transaction.atomic():
+                users = AuthUsers.objects.bulk_create([
+                    AuthUsers(username=f'bench-{uuid.uuid4().hex[:12]}', email='', password='!')
+                    for _ in range(iterations)
+                ])
+                # First pass inserts, second pass updates the rows created by the first.
+                self.run('legacy', self.legacy_flow, users)
+                self.run('legacy', self.legacy_flow, users)
+                UserPreference.objects.filter(user__in=users).delete()
+                self.run('upsert', self.upsert_flow, users)
+                self.run('upsert', self.upsert_flow, users)
+                raise Rollback
+        except Rollback:
+            pass
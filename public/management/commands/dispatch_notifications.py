@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from public.notifications import run_dispatcher
+from public.push import get_push_engine
+
+
+class Command(BaseCommand):
+    help = 'Send due NotificationSchedule rows as Notification records and web pushes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--max-per-host', type=int,
+            help="Concurrent requests per push service (default: WEB_PUSH['MAX_PER_HOST']).",
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting once drained.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['max_per_host'] is not None:
+            overrides['MAX_PER_HOST'] = options['max_per_host']
+        # One engine for the whole run, so push-service connections are reused between polls
+        with get_push_engine(**overrides) as engine:
+            while True:
+                sent = run_dispatcher(batch_size=options['batch_size'], engine=engine)
+                if sent:
+                    self.stdout.write(f'Dispatched {sent} notifications')
+                if not options['loop']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from public.prayer_log import rebuild_prayer_periods
+
+
+class Command(BaseCommand):
+    help = 'Recompute the weekly and monthly UserPrayerPeriodSummary rows from UserPrayerSummary.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per batch.')
+
+    def handle(self, *args, **options):
+        total = rebuild_prayer_periods(batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt {total} prayer period summaries')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from public.reading_stats import rebuild_reading_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's UserReadingStat (totals and streaks) and daily rollup from QuranProgress."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        total = rebuild_reading_stats(batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt reading stats for {total} users')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from public.counters import reconcile_post_counters
+from public.models import CommunityPost
+
+
+class Command(BaseCommand):
+    help = 'Recompute CommunityPost reaction/comment/support counters that drifted from the child tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Posts per UPDATE batch, to keep lock scope bounded.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        totals = {}
+        last_id = None
+
+        while True:
+            posts = CommunityPost.objects.order_by('pk')
+            if last_id is not None:
+                posts = posts.filter(pk__gt=last_id)
+            ids = list(posts.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            with transaction.atomic():
+                for counter, fixed in reconcile_post_counters(ids).items():
+                    totals[counter] = totals.get(counter, 0) + fixed
+            last_id = ids[-1]
+
+        for counter, fixed in totals.items():
+            self.stdout.write(f'{counter}: {fixed} posts corrected')
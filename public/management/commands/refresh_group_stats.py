@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from public.leaderboards import write_back_group_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute AccountabilityGroup member_count and average_streak and bulk-write the changed groups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = write_back_group_stats(batch_size=options['batch_size'])
+        self.stdout.write(f'Updated {updated} groups')
@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+from public.quran_metadata import DATASETS
+from public.quran_refresh import apply_dataset, fetch_all, load_file
+
+
+class Command(BaseCommand):
+    help = 'Refresh CachedChapters/CachedReciter from a JSON file or an upstream (or stand-in) HTTP API.'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--file', help='JSON file with "chapters" and/or "reciters" lists.')
+        source.add_argument('--url', help='API base URL serving /chapters and /reciters (paginated with ?page=N).')
+        parser.add_argument('--only', choices=sorted(DATASETS), action='append', help='Limit to these datasets.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Maximum HTTP requests in flight.')
+        parser.add_argument('--prune', action='store_true', help='Delete stored rows missing from the source.')
+
+    def handle(self, *args, **options):
+        cache_types = options['only'] or sorted(DATASETS)
+        try:
+            if options['file']:
+                data = load_file(options['file'], cache_types)
+            else:
+                data = asyncio.run(fetch_all(options['url'], cache_types, concurrency=options['concurrency']))
+        except (OSError, ValueError, httpx.HTTPError) as exc:
+            raise CommandError(f'Could not read source: {exc}')
+
+        for cache_type in cache_types:
+            try:
+                result = apply_dataset(cache_type, data[cache_type], prune=options['prune'])
+            except KeyError as exc:
+                raise CommandError(f'{cache_type}: record is missing field {exc}')
+            self.stdout.write(
+                f"{cache_type}: {result['created']} created, {result['updated']} updated, "
+                f"{result['unchanged']} unchanged, {result['deleted']} deleted"
+            )
@@ -0,0 +1,58 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class StandInPushHandler(BaseHTTPRequestHandler):
+    """
+    Minimal push service: 201 for any POST, except endpoints whose path
+    contains /gone/ (410), /missing/ (404) or /busy/ (429 on the first try).
+    """
+    received = 0
+    busy_seen = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with self.lock:
+            StandInPushHandler.received += 1
+            first_busy = '/busy/' in self.path and self.path not in self.busy_seen
+            if first_busy:
+                self.busy_seen.add(self.path)
+
+        if '/gone/' in self.path:
+            status = 410
+        elif '/missing/' in self.path:
+            status = 404
+        elif first_busy:
+            status = 429
+        else:
+            status = 201
+
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in push service for exercising the push engine without real browsers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), StandInPushHandler)
+        self.stdout.write(f"Stand-in push service on http://127.0.0.1:{options['port']}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Received {StandInPushHandler.received} pushes')
@@ -0,0 +1,60 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+class StandInQuranHandler(BaseHTTPRequestHandler):
+    """Serves GET /<dataset>?page=N from a JSON file, ``page_size`` records per page."""
+    data = {}
+    page_size = 20
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        dataset = parts.path.strip('/')
+        if dataset not in self.data:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        records = self.data[dataset]
+        page = int(parse_qs(parts.query).get('page', ['1'])[0])
+        total_pages = max(1, -(-len(records) // self.page_size))
+        start = (page - 1) * self.page_size
+        body = json.dumps({
+            dataset: records[start:start + self.page_size],
+            'pagination': {'current_page': page, 'total_pages': total_pages, 'total_records': len(records)},
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in Quran API serving a JSON file, for exercising refresh_quran_metadata.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='JSON file with "chapters" and/or "reciters" lists.')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with open(options['file'], encoding='utf-8') as f:
+            StandInQuranHandler.data = json.load(f)
+        StandInQuranHandler.page_size = options['page_size']
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), StandInQuranHandler)
+        self.stdout.write(f"Stand-in Quran API on http://127.0.0.1:{options['port']}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from public.notifications import schedule_prayer_reminders
+from public.prayer_times import CALCULATION_METHODS
+
+
+class Command(BaseCommand):
+    help = "Precompute a day's prayer reminder NotificationSchedule rows for all opted-in users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='YYYY-MM-DD, defaults to today (UTC).')
+        parser.add_argument('--method', choices=sorted(CALCULATION_METHODS), default='MWL')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.now().date()
+        created = schedule_prayer_reminders(day, method=options['method'], batch_size=options['batch_size'])
+        self.stdout.write(f'Scheduled {created} prayer reminders for {day}')
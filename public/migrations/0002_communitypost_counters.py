@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    CommunityPost = apps.get_model('public', 'CommunityPost')
+    counters = {
+        'reaction_count': (apps.get_model('public', 'CommunityReaction'), 'post_id'),
+        'comment_count': (apps.get_model('public', 'CommunityComment'), 'post'),
+        'support_count': (apps.get_model('public', 'PrayerSupport'), 'post_id'),
+    }
+    for counter, (model, post_field) in counters.items():
+        counts = (
+            model.objects.filter(**{post_field: OuterRef('pk')})
+            .order_by()
+            .values(post_field)
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        CommunityPost.objects.update(**{counter: Coalesce(Subquery(counts, output_field=IntegerField()), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('public', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communitypost',
+            name='reaction_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='support_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
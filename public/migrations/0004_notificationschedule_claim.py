@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('public', '0003_chathistory_session_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationschedule',
+            name='claimed_by',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationschedule',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notificationschedule',
+            index=models.Index(condition=models.Q(('sent', False)), fields=['scheduled_for'], name='idx_noti_sched_unsent'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('public', '0005_userpreference_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpreference',
+            name='timezone',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_progress(apps, schema_editor):
+    QuranProgress = apps.get_model('public', 'QuranProgress')
+    duplicates = (
+        QuranProgress.objects.filter(session_id__isnull=False)
+        .values('user_id', 'session_id', 'page_number')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in list(duplicates):
+        rows = QuranProgress.objects.filter(
+            user_id=group['user_id'], session_id=group['session_id'], page_number=group['page_number'],
+        ).order_by('created_at', 'id')
+        keep = rows.values_list('id', flat=True).first()
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('public', '0006_userpreference_timezone'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_progress, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quranprogress',
+            constraint=models.UniqueConstraint(condition=models.Q(('session_id__isnull', False)), fields=('user', 'session_id', 'page_number'), name='quran_progress_user_session_page_key'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('public', '0007_quranprogress_session_page_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quranprogress',
+            index=models.Index(fields=['user', 'completed_at'], name='idx_quran_prog_user_done'),
+        ),
+        migrations.AddIndex(
+            model_name='quranprogress',
+            index=models.Index(fields=['user', 'surah_number', 'page_number'], name='idx_quran_prog_user_page'),
+        ),
+        migrations.CreateModel(
+            name='QuranReadingDay',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('pages_read', models.IntegerField(default=0)),
+                ('reading_time_seconds', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quran_reading_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'quran_reading_days',
+                'managed': True,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quranreadingday',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='quran_reading_days_user_day_key'),
+        ),
+    ]
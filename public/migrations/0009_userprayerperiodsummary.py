@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('public', '0008_quranprogress_indexes_quranreadingday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPrayerPeriodSummary',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('prayers_completed', models.IntegerField(default=0)),
+                ('full_days', models.IntegerField(default=0)),
+                ('total_points', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prayer_period_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_prayer_period_summary',
+                'managed': True,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userprayerperiodsummary',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'period_start'), name='user_prayer_period_summary_key'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('public', '0009_userprayerperiodsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationschedule',
+            name='target_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notificationschedule',
+            index=models.Index(condition=models.Q(('sent', False)), fields=['target_date'], name='idx_noti_sched_target_unsent'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 from custom_auth.models import AuthUsers
 
@@ -7,6 +7,7 @@ from datetime import timedelta
 from django.core.validators import MinLengthValidator, MinValueValidator, MaxValueValidator
 
 from custom_auth.models import AuthUsers
+from .upsert import upsert
 
 STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -225,6 +226,55 @@ class UserPrayerSummary(models.Model):
         return f"UserPrayerSummary(user={self.user_id}, date={self.date})"
 
 
+class UserPrayerPeriodSummary(models.Model):
+    """Weekly (Monday-start) and monthly totals over UserPrayerSummary, maintained on each log."""
+    PERIOD_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(AuthUsers, on_delete=models.CASCADE, related_name='prayer_period_summaries')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    prayers_completed = models.IntegerField(default=0)
+    full_days = models.IntegerField(default=0)
+    total_points = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'user_prayer_period_summary'
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'period_start'], name='user_prayer_period_summary_key'),
+        ]
+
+    def __str__(self):
+        return f"UserPrayerPeriodSummary(user={self.user_id}, {self.period}={self.period_start})"
+
+
+
+
+class UserPreferenceManager(models.Manager):
+    def upsert(self, user, **changes):
+        """
+        Create the user's preference row or apply ``changes`` to the existing
+        one in a single statement (MERGE on SQL Server, ON CONFLICT elsewhere).
+        """
+        now = timezone.now()
+        values = {
+            field.attname: field.get_default()
+            for field in self.model._meta.concrete_fields
+        }
+        values.update(changes)
+        values.update(id=uuid.uuid4(), user_id=user.pk, created_at=now, updated_at=now)
+        return upsert(
+            self.model,
+            conflict_fields=['user'],
+            values=values,
+            update_fields=list(changes) + ['updated_at'],
+            using=self.db,
+        )
 
 
 class UserPreference(models.Model):
@@ -242,6 +292,13 @@ class UserPreference(models.Model):
     llm_model = models.CharField(max_length=50, null=True, default='gpt-3.5-turbo')
     system_prompt = models.TextField(null=True, blank=True)
     knowledge_base = models.TextField(null=True, blank=True)
+    # Used to compute prayer reminder times
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # IANA name such as 'Asia/Riyadh'; decides which local day a reading counts towards
+    timezone = models.CharField(max_length=64, null=True, blank=True)
+
+    objects = UserPreferenceManager()
 
     class Meta:
         db_table = 'user_preferences'
@@ -352,10 +409,19 @@ class NotificationSchedule(models.Model):
     scheduled_for = models.DateTimeField()
     sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
+    # Set by the dispatcher when it claims the row; a stale claim can be taken over
+    claimed_by = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # The local calendar date a generated reminder belongs to, so a day can be regenerated on its own
+    target_date = models.DateField(null=True, blank=True)
 
     class Meta:
         db_table = 'notification_schedule'
         managed = True
+        indexes = [
+            models.Index(fields=['scheduled_for'], condition=models.Q(sent=False), name='idx_noti_sched_unsent'),
+            models.Index(fields=['target_date'], condition=models.Q(sent=False), name='idx_noti_sched_target_unsent'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user_id} at {self.scheduled_for}"
@@ -459,6 +525,37 @@ class PostCategory(models.Model):
         return self.name
 
 
+class PostCounterMixin:
+    """
+    Keeps one of CommunityPost's counter columns in step with this model's rows.
+    The increment runs in the same transaction as the INSERT; the matching
+    decrement is done by the post_delete receiver in public.signals, which
+    Django already runs inside the delete transaction. bulk_create() and raw
+    SQL bypass both, which reconcile_post_counters repairs.
+    """
+    counter_post_field = None
+    counter_name = None
+
+    def counted_post_id(self):
+        return getattr(self, self.counter_post_field)
+
+    def bump_post_counter(self, delta, using=None):
+        post_id = self.counted_post_id()
+        if post_id is None:
+            return
+        CommunityPost.objects.using(using).filter(pk=post_id).update(
+            **{self.counter_name: models.F(self.counter_name) + delta}
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            self.bump_post_counter(1, using=using)
+
+
 class CommunityPost(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user_id = models.ForeignKey(AuthUsers, related_name='community_posts', on_delete=models.CASCADE, null=True)
@@ -470,6 +567,10 @@ class CommunityPost(models.Model):
     is_pinned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=False)
     updated_at = models.DateTimeField(auto_now_add=False)
+    # Denormalized, maintained by PostCounterMixin
+    reaction_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    support_count = models.IntegerField(default=0)
 
     class Meta:
         db_table = 'community_posts'
@@ -482,7 +583,10 @@ class CommunityPost(models.Model):
     def __str__(self):
         return f"{'Anonymous' if self.is_anonymous else self.user_id} - {self.title[:30]}"
 
-class PrayerSupport(models.Model):
+class PrayerSupport(PostCounterMixin, models.Model):
+    counter_post_field = 'post_id_id'
+    counter_name = 'support_count'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post_id = models.ForeignKey(CommunityPost, on_delete=models.CASCADE, db_column='post_id', related_name='prayer_supports')
     supporter_user_id = models.UUIDField()
@@ -534,12 +638,45 @@ class QuranProgress(models.Model):
     class Meta:
         db_table = 'quran_progress'
         managed = True
+        constraints = [
+            # Lets offline sync re-send pages safely; rows without a session are not deduplicated
+            models.UniqueConstraint(
+                fields=['user', 'session_id', 'page_number'],
+                condition=models.Q(session_id__isnull=False),
+                name='quran_progress_user_session_page_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'completed_at'], name='idx_quran_prog_user_done'),
+            models.Index(fields=['user', 'surah_number', 'page_number'], name='idx_quran_prog_user_page'),
+        ]
 
     def __str__(self):
         return f"QuranProgress(user={self.user_id}, surah={self.surah_number}, page={self.page_number})"
 
 
 
+
+class QuranReadingDay(models.Model):
+    """Per-user, per-local-day reading totals, maintained alongside UserReadingStat."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(AuthUsers, on_delete=models.CASCADE, related_name='quran_reading_days')
+    day = models.DateField()
+    pages_read = models.IntegerField(default=0)
+    reading_time_seconds = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'quran_reading_days'
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='quran_reading_days_user_day_key'),
+        ]
+
+    def __str__(self):
+        return f"QuranReadingDay(user={self.user_id}, day={self.day}, pages={self.pages_read})"
+
+
 class SavedPost(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user_id = models.UUIDField()
@@ -681,7 +818,8 @@ class ChatHistory(models.Model):
         indexes = [
             models.Index(fields=['user'], name='idx_chat_history_user_id'),
             models.Index(fields=['session_id'], name='idx_chat_history_session_id'),
-            models.Index(fields=['created_at'], name='idx_chat_history_created_at')
+            models.Index(fields=['created_at'], name='idx_chat_history_created_at'),
+            models.Index(fields=['session_id', 'created_at'], name='idx_chat_hist_sess_ct_at'),
         ]
 
     def __str__(self):
@@ -690,7 +828,10 @@ class ChatHistory(models.Model):
 
 
 
-class CommunityComment(models.Model):
+class CommunityComment(PostCounterMixin, models.Model):
+    counter_post_field = 'post_id'
+    counter_name = 'comment_count'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey(CommunityPost, on_delete=models.CASCADE, db_column='post_id', related_name='comments')
     user = models.ForeignKey(AuthUsers, on_delete=models.CASCADE, null=True, db_column='user_id', related_name='user_comments')
@@ -734,7 +875,10 @@ class CommunityJoinRequest(models.Model):
 
 
 
-class CommunityReaction(models.Model):
+class CommunityReaction(PostCounterMixin, models.Model):
+    counter_post_field = 'post_id_id'
+    counter_name = 'reaction_count'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user_id = models.ForeignKey(AuthUsers, on_delete=models.CASCADE, db_column='user_id', related_name='community_reactions')
     post_id = models.ForeignKey('CommunityPost', on_delete=models.CASCADE, null=True, blank=True, db_column='post_id', related_name='reactions')
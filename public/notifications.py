@@ -0,0 +1,265 @@
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import is_process_local
+from .models import Notification, NotificationSchedule, PushSubscription, UserPreference
+from .prayer_times import PRAYERS, bucket_coordinates, prayer_times_utc
+from .push import get_push_engine
+
+logger = logging.getLogger(__name__)
+
+# notification_type -> (title, message)
+NOTIFICATION_TEMPLATES = {
+    'prayer_reminder': ('Prayer reminder', "It's time to pray."),
+    'quran_reminder': ('Daily Quran goal', "Keep your streak going with today's pages."),
+    'prayer_fajr': ('Fajr', "It's time for Fajr prayer."),
+    'prayer_dhuhr': ('Dhuhr', "It's time for Dhuhr prayer."),
+    'prayer_asr': ('Asr', "It's time for Asr prayer."),
+    'prayer_maghrib': ('Maghrib', "It's time for Maghrib prayer."),
+    'prayer_isha': ('Isha', "It's time for Isha prayer."),
+}
+
+PRAYER_NOTIFICATION_TYPES = [f'prayer_{name}' for name in PRAYERS]
+
+# A claim older than this is assumed to belong to a dead worker and may be taken over
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+UNREAD_COUNT_TIMEOUT = 3600
+# On a process-local backend the dispatcher's writes never reach the web
+# workers, so their counters only live long enough to absorb badge polling.
+UNREAD_COUNT_LOCAL_TIMEOUT = 30
+
+
+def _unread_key(user_id):
+    return f'notifications_unread:{user_id}'
+
+
+def _counter_cache():
+    return caches[getattr(settings, 'NOTIFICATION_COUNTER_CACHE', 'default')]
+
+
+def _unread_timeout(cache):
+    return UNREAD_COUNT_LOCAL_TIMEOUT if is_process_local(cache) else UNREAD_COUNT_TIMEOUT
+
+
+def get_unread_count(user_id):
+    """
+    Badge count from the counter cache, falling back to one COUNT(*) on a miss.
+    Increments that race with that first COUNT are lost at worst until the
+    entry expires, so the badge self-heals within the cache timeout.
+    """
+    cache = _counter_cache()
+    count = cache.get(_unread_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read_status=False).count()
+        cache.add(_unread_key(user_id), count, _unread_timeout(cache))
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    """
+    Apply ``delta`` to a shared counter that exists; a missing one is rebuilt
+    on next read. A process-local counter is dropped instead, since other
+    processes could not see the change anyway.
+    """
+    if not delta:
+        return
+    cache = _counter_cache()
+    if is_process_local(cache):
+        cache.delete(_unread_key(user_id))
+        return
+    try:
+        cache.incr(_unread_key(user_id), delta)
+    except ValueError:
+        pass
+
+
+def reset_unread_count(user_id):
+    cache = _counter_cache()
+    cache.set(_unread_key(user_id), 0, _unread_timeout(cache))
+
+
+def render_notification(notification_type):
+    default_title = notification_type.replace('_', ' ').capitalize()
+    return NOTIFICATION_TEMPLATES.get(notification_type, (default_title, ''))
+
+
+def claim_due_schedules(batch_size, now=None):
+    """
+    Claim up to ``batch_size`` due, unsent rows for this worker and return them.
+
+    Candidates are read with SKIP LOCKED (READPAST on SQL Server) through the
+    filtered idx_noti_sched_unsent index. The claim itself is a conditional
+    UPDATE, so two workers can never both take a row. On backends without
+    SKIP LOCKED the same UPDATE still settles races.
+    """
+    now = now or timezone.now()
+    token = uuid.uuid4()
+    claimable = Q(claimed_by__isnull=True) | Q(claimed_at__lt=now - CLAIM_LEASE)
+    due = (
+        NotificationSchedule.objects
+        .filter(claimable, sent=False, scheduled_for__lte=now)
+        .order_by('scheduled_for')
+    )
+
+    with transaction.atomic():
+        ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        NotificationSchedule.objects.filter(claimable, pk__in=ids, sent=False).update(claimed_by=token, claimed_at=now)
+
+    # Seek by primary key; claimed_by has no index of its own
+    return list(NotificationSchedule.objects.filter(pk__in=ids, claimed_by=token, sent=False))
+
+
+def dispatch_batch(schedules, engine):
+    """
+    Turn claimed schedules into Notification rows and push messages: one
+    subscription query, one bulk INSERT and one UPDATE per batch, with
+    pushes delivered concurrently by the async ``engine``.
+
+    Rows whose claim was taken over by another worker after this one's lease
+    ran out (or that were sent meanwhile) are dropped, so each schedule is
+    delivered by exactly one worker.
+    """
+    subscriptions = defaultdict(list)
+    for subscription in PushSubscription.objects.filter(user_id__in={s.user_id_id for s in schedules}):
+        subscriptions[subscription.user_id].append(subscription)
+
+    now = timezone.now()
+    # Record first, then push: a crash mid-batch loses pushes rather than duplicating them
+    with transaction.atomic():
+        # Locking the rows makes a concurrent takeover wait for this commit, after which they are sent
+        owned = set(
+            NotificationSchedule.objects.select_for_update()
+            .filter(pk__in=[s.pk for s in schedules], claimed_by__in={s.claimed_by for s in schedules}, sent=False)
+            .values_list('pk', flat=True)
+        )
+        schedules = [schedule for schedule in schedules if schedule.pk in owned]
+        notifications = []
+        for schedule in schedules:
+            title, message = render_notification(schedule.notification_type)
+            notifications.append(Notification(
+                user_id_id=schedule.user_id_id,
+                notification_type=schedule.notification_type,
+                title=title,
+                message=message,
+                data=json.dumps({'schedule_id': str(schedule.id)}),
+                created_at=now,
+                updated_at=now,
+            ))
+        Notification.objects.bulk_create(notifications)
+        NotificationSchedule.objects.filter(pk__in=owned).update(sent=True)
+
+    per_user = defaultdict(int)
+    for notification in notifications:
+        per_user[notification.user_id_id] += 1
+    for user_id, count in per_user.items():
+        adjust_unread_count(user_id, count)
+
+    jobs = [
+        (subscription, {'title': n.title, 'body': n.message, 'type': n.notification_type, 'id': str(n.id)})
+        for n in notifications
+        for subscription in subscriptions[n.user_id_id]
+    ]
+    return len(notifications), engine.deliver(jobs)
+
+
+def run_dispatcher(batch_size=500, engine=None):
+    """
+    Drain every due schedule; returns the number of notifications created.
+    A caller-supplied ``engine`` is left open for reuse; one created here is
+    closed once the queue is drained.
+    """
+    if engine is None:
+        with get_push_engine() as engine:
+            return run_dispatcher(batch_size, engine)
+    total = 0
+    while True:
+        schedules = claim_due_schedules(batch_size)
+        if not schedules:
+            return total
+        created, _ = dispatch_batch(schedules, engine)
+        total += created
+        logger.info('Dispatched %d notifications', created)
+
+
+def opted_in_locations(chunk_size=10000):
+    """
+    Yield (user_id, latitude, longitude) for every user who wants prayer
+    reminders. Reads keyset-sized chunks so no cursor stays open while the
+    caller inserts (SQL Server without MARS allows one active result set).
+    """
+    rows = (
+        UserPreference.objects
+        .filter(prayer_reminders=True, notifications_enabled=True, latitude__isnull=False, longitude__isnull=False)
+        .order_by('user_id')
+        .values_list('user_id', 'latitude', 'longitude')
+    )
+    last_user_id = None
+    while True:
+        chunk = list((rows.filter(user_id__gt=last_user_id) if last_user_id else rows)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_user_id = chunk[-1][0]
+
+
+def build_prayer_schedules(rows, day, method='MWL', not_before=None, calculate=prayer_times_utc):
+    """
+    Yield unsaved NotificationSchedule rows for ``day``. Prayer times are
+    computed once per location bucket (memoized in prayer_times_utc), so the
+    cost scales with distinct locations rather than users.
+    """
+    for user_id, latitude, longitude in rows:
+        times = calculate(*bucket_coordinates(latitude, longitude), day, method)
+        for name in PRAYERS:
+            at = times[name]
+            if at is None or (not_before and at < not_before):
+                continue
+            yield NotificationSchedule(
+                user_id_id=user_id,
+                notification_type=f'prayer_{name}',
+                scheduled_for=at,
+                target_date=day,
+            )
+
+
+def schedule_prayer_reminders(day, method='MWL', batch_size=5000):
+    """
+    Replace the unsent, still upcoming prayer reminders for local date
+    ``day`` with freshly computed ones. Other days' rows are untouched.
+    Each ``batch_size`` insert commits on its own, so the dispatcher can
+    start on early rows while the rest are written. Returns the row count.
+    """
+    now = timezone.now()
+    NotificationSchedule.objects.filter(
+        notification_type__in=PRAYER_NOTIFICATION_TYPES,
+        target_date=day,
+        sent=False,
+        scheduled_for__gte=now,
+    ).delete()
+
+    created = 0
+    batch = []
+    for schedule in build_prayer_schedules(opted_in_locations(), day, method, not_before=now):
+        schedule.created_at = now
+        batch.append(schedule)
+        if len(batch) >= batch_size:
+            NotificationSchedule.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        NotificationSchedule.objects.bulk_create(batch)
+        created += len(batch)
+    return created
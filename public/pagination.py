@@ -0,0 +1,100 @@
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the "rows after this one" predicate for a multi-column ordering, e.g.
+    for ('-is_pinned', '-created_at', '-id'):
+    is_pinned < p OR (is_pinned = p AND created_at < c) OR (... AND id < i).
+    """
+    condition = Q()
+    for i, term in enumerate(ordering):
+        field = term.lstrip('-')
+        lookup = 'lt' if term.startswith('-') else 'gt'
+        equal = {prev.lstrip('-'): value for prev, value in zip(ordering[:i], values[:i])}
+        condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder, but times keep their microseconds so the seek is exact."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the full ``ordering`` tuple, so every page
+    is an index range scan with no OFFSET. ``ordering`` must end in a unique
+    field. The cursor is the ordering values of the last row served.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, instance):
+        values = [getattr(instance, term.lstrip('-')) for term in self.ordering]
+        payload = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, queryset, token):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()))
+            opts = queryset.model._meta
+            return [opts.get_field(term.lstrip('-')).to_python(value) for term, value in zip(self.ordering, values)]
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            queryset = queryset.filter(keyset_filter(self.ordering, self.decode_cursor(queryset, token)))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_cursor(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('cursor', self.get_next_cursor()),
+            ('results', data),
+        ]))
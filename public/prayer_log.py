@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import build_tiered_cache
+from .models import PrayerReward, UserPrayerPeriodSummary, UserPrayerSummary
+from .prayer_times import PRAYERS
+from .upsert import update_or_insert
+
+reward_cache = build_tiered_cache('prayer_rewards')
+
+FULL_DAY_MASK = (1 << len(PRAYERS)) - 1
+
+
+def load_rewards():
+    return {name.lower(): reward for name, reward in PrayerReward.objects.values_list('name', 'reward')}
+
+
+def get_rewards():
+    """``{prayer name: points}``, read from the database once per cache lifetime."""
+    return reward_cache.get_or_set('all', load_rewards)
+
+
+def invalidate_rewards():
+    reward_cache.delete('all')
+
+
+def score_prayers(prayers, rewards=None):
+    rewards = get_rewards() if rewards is None else rewards
+    return sum(rewards.get(name, 0) for name in prayers)
+
+
+def prayer_mask(prayers):
+    """Bit i set when PRAYERS[i] is in ``prayers``."""
+    return sum(1 << i for i, name in enumerate(PRAYERS) if name in prayers)
+
+
+def period_starts(day):
+    return {'week': day - timedelta(days=day.weekday()), 'month': day.replace(day=1)}
+
+
+def apply_prayer_periods(user_id, day, prayers=1, full_days=0, points=0):
+    """Add a day's change to the user's week and month aggregate rows."""
+    now = timezone.now()
+    for period, start in period_starts(day).items():
+        update_or_insert(
+            UserPrayerPeriodSummary,
+            dict(user_id=user_id, period=period, period_start=start),
+            dict(
+                prayers_completed=F('prayers_completed') + prayers,
+                full_days=F('full_days') + full_days,
+                total_points=F('total_points') + points,
+                updated_at=now,
+            ),
+            dict(prayers_completed=prayers, full_days=full_days, total_points=points, updated_at=now),
+        )
+
+
+def log_prayer(user_id, day, prayer):
+    """
+    Add ``prayer`` to the user's UserPrayerSummary for ``day`` and return the
+    row. The row is locked while the list is merged and points recomputed, so
+    two devices logging different prayers at once both land; logging a prayer
+    twice is a no-op. The week and month aggregates move in the same
+    transaction.
+    """
+    rewards = get_rewards()
+    with transaction.atomic():
+        summary = UserPrayerSummary.objects.select_for_update().filter(user_id=user_id, date=day).first()
+        if summary is None:
+            try:
+                with transaction.atomic():
+                    summary = UserPrayerSummary.objects.create(
+                        user_id=user_id,
+                        date=day,
+                        completed_prayers=[prayer],
+                        total_points=score_prayers([prayer], rewards),
+                    )
+                apply_prayer_periods(user_id, day, 1, 0, summary.total_points)
+                return summary
+            except IntegrityError:
+                # The other device created the row first; merge into it
+                summary = UserPrayerSummary.objects.select_for_update().get(user_id=user_id, date=day)
+
+        if prayer in summary.completed_prayers:
+            return summary
+        previous_points = summary.total_points
+        summary.completed_prayers = summary.completed_prayers + [prayer]
+        summary.total_points = score_prayers(summary.completed_prayers, rewards)
+        summary.save(update_fields=['completed_prayers', 'total_points'])
+        full_day = int(prayer_mask(summary.completed_prayers) == FULL_DAY_MASK)
+        apply_prayer_periods(user_id, day, 1, full_day, summary.total_points - previous_points)
+    return summary
+
+
+def _fold_periods(summaries, now):
+    rows = {}
+    for user_id, day, prayers, points in summaries:
+        mask = prayer_mask(prayers or [])
+        for period, start in period_starts(day).items():
+            row = rows.get((user_id, period, start))
+            if row is None:
+                row = rows[(user_id, period, start)] = UserPrayerPeriodSummary(
+                    user_id=user_id, period=period, period_start=start, updated_at=now,
+                )
+            row.prayers_completed += bin(mask).count('1')
+            row.full_days += int(mask == FULL_DAY_MASK)
+            row.total_points += points or 0
+    return list(rows.values())
+
+
+def rebuild_prayer_periods(batch_size=500):
+    """
+    Recompute UserPrayerPeriodSummary from UserPrayerSummary, ``batch_size``
+    users at a time (one read, one delete and one bulk insert per batch).
+    Returns the number of aggregate rows written.
+    """
+    user_ids = list(UserPrayerSummary.objects.order_by('user_id').values_list('user_id', flat=True).distinct())
+    now = timezone.now()
+    total = 0
+    for i in range(0, len(user_ids), batch_size):
+        batch = user_ids[i:i + batch_size]
+        summaries = UserPrayerSummary.objects.filter(user_id__in=batch).values_list(
+            'user_id', 'date', 'completed_prayers', 'total_points',
+        )
+        rows = _fold_periods(summaries, now)
+        with transaction.atomic():
+            UserPrayerPeriodSummary.objects.filter(user_id__in=batch).delete()
+            UserPrayerPeriodSummary.objects.bulk_create(rows, batch_size=1000)
+        total += len(rows)
+    return total
@@ -0,0 +1,116 @@
+"""
+Prayer time calculation (the praytimes.org astronomical method, simplified to
+one refinement pass, accurate to about a minute).
+
+Times are returned as UTC datetimes for the given local calendar date, so no
+timezone database is needed here; callers only pick which date is "today".
+"""
+import math
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+PRAYERS = ('fajr', 'dhuhr', 'asr', 'maghrib', 'isha')
+
+# name -> (fajr angle, isha angle, or isha minutes after maghrib when > 60)
+CALCULATION_METHODS = {
+    'MWL': (18.0, 17.0),
+    'ISNA': (15.0, 15.0),
+    'Egypt': (19.5, 17.5),
+    'Makkah': (18.5, 90),
+    'Karachi': (18.0, 18.0),
+}
+
+# Coordinates are bucketed to this many decimal places (~11 km), well under
+# a minute of prayer time difference, so nearby users share one calculation.
+BUCKET_PRECISION = 1
+
+
+def _sin(d):
+    return math.sin(math.radians(d))
+
+
+def _cos(d):
+    return math.cos(math.radians(d))
+
+
+def _tan(d):
+    return math.tan(math.radians(d))
+
+
+def _fix(value, bound):
+    value = value - bound * math.floor(value / bound)
+    return value + bound if value < 0 else value
+
+
+def _julian_day(day):
+    year, month = day.year, day.month
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1)) + day.day + b - 1524.5
+
+
+def _sun_position(jd):
+    d = jd - 2451545.0
+    g = _fix(357.529 + 0.98560028 * d, 360)
+    q = _fix(280.459 + 0.98564736 * d, 360)
+    ecliptic_long = _fix(q + 1.915 * _sin(g) + 0.020 * _sin(2 * g), 360)
+    obliquity = 23.439 - 0.00000036 * d
+    right_ascension = _fix(math.degrees(math.atan2(_cos(obliquity) * _sin(ecliptic_long), _cos(ecliptic_long))) / 15, 24)
+    declination = math.degrees(math.asin(_sin(obliquity) * _sin(ecliptic_long)))
+    equation_of_time = q / 15 - right_ascension
+    return declination, equation_of_time
+
+
+def _mid_day(jd, t):
+    _, eqt = _sun_position(jd + t / 24)
+    return _fix(12 - eqt, 24)
+
+
+def _sun_angle_time(jd, latitude, angle, t, before_noon):
+    declination, _ = _sun_position(jd + t / 24)
+    noon = _mid_day(jd, t)
+    cos_hour = (-_sin(angle) - _sin(declination) * _sin(latitude)) / (_cos(declination) * _cos(latitude))
+    if not -1 <= cos_hour <= 1:
+        return None  # the sun never reaches this angle (high latitudes)
+    hours = math.degrees(math.acos(cos_hour)) / 15
+    return noon - hours if before_noon else noon + hours
+
+
+def _asr_time(jd, latitude, factor, t):
+    declination, _ = _sun_position(jd + t / 24)
+    angle = -math.degrees(math.atan(1 / (factor + _tan(abs(latitude - declination)))))
+    return _sun_angle_time(jd, latitude, angle, t, before_noon=False)
+
+
+def bucket_coordinates(latitude, longitude):
+    return round(latitude, BUCKET_PRECISION), round(longitude, BUCKET_PRECISION)
+
+
+@lru_cache(maxsize=65536)
+def prayer_times_utc(latitude, longitude, day, method='MWL', asr_factor=1):
+    """
+    Return ``{prayer: aware UTC datetime or None}`` for ``day`` at the given
+    coordinates. Memoized, so pass bucketed coordinates to share results.
+    """
+    fajr_angle, isha_param = CALCULATION_METHODS[method]
+    jd = _julian_day(day) - longitude / (15 * 24)
+
+    # One refinement pass from the usual initial guesses (hours of the day)
+    fajr = _sun_angle_time(jd, latitude, fajr_angle, 5, before_noon=True)
+    dhuhr = _mid_day(jd, 12)
+    asr = _asr_time(jd, latitude, asr_factor, 13)
+    maghrib = _sun_angle_time(jd, latitude, 0.833, 18, before_noon=False)
+    if isha_param > 60:
+        isha = maghrib + isha_param / 60 if maghrib is not None else None
+    else:
+        isha = _sun_angle_time(jd, latitude, isha_param, 18, before_noon=False)
+
+    midnight_utc = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    offset = -longitude / 15
+    times = {}
+    for name, hours in zip(PRAYERS, (fajr, dhuhr, asr, maghrib, isha)):
+        times[name] = None if hours is None else midnight_utc + timedelta(hours=hours + offset)
+    return times
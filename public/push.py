@@ -0,0 +1,265 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import struct
+import time
+from collections import defaultdict, namedtuple
+from urllib.parse import urlsplit
+
+import httpx
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+
+from .cache import LRUCache
+from .models import PushSubscription
+
+logger = logging.getLogger(__name__)
+
+PushResult = namedtuple('PushResult', ['subscription', 'status', 'attempts'])
+
+DEAD_STATUSES = (404, 410)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RECORD_SIZE = 4096
+VAPID_LIFETIME = 12 * 3600
+
+
+def b64url_decode(value):
+    value = value.strip()
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def b64url_encode(value):
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode()
+
+
+def _hkdf(salt, ikm, info, length):
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=salt, info=info).derive(ikm)
+
+
+def _public_bytes(public_key):
+    return public_key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+
+
+def load_vapid_key(value):
+    """Accept a PEM private key or the raw base64url-encoded 32-byte scalar."""
+    if value.lstrip().startswith('-----BEGIN'):
+        return serialization.load_pem_private_key(value.encode(), password=None)
+    return ec.derive_private_key(int.from_bytes(b64url_decode(value), 'big'), ec.SECP256R1())
+
+
+class PushEngine:
+    """
+    Async Web Push (RFC 8030/8291/8292) sender.
+
+    Subscriptions are grouped by push-service origin; each origin shares one
+    pooled HTTP/2 connection through a single httpx client, a semaphore capping
+    in-flight requests, and a cached VAPID Authorization header. Decoded
+    subscription keys are cached per (subscription, key) pair; the ephemeral
+    ECDH key is still fresh per message as RFC 8291 requires.
+
+    The engine owns one event loop and one long-lived client, opened on the
+    first ``deliver`` and kept until ``close``, so connections to each push
+    service are reused across batches. Use it as a context manager.
+    """
+
+    def __init__(self, vapid_private_key, vapid_subject, ttl=3600, max_per_host=100,
+                 max_retries=3, backoff=0.5, timeout=10.0, transport=None, http2=True,
+                 keepalive_expiry=60.0):
+        self.vapid_key = load_vapid_key(vapid_private_key)
+        self.vapid_public = b64url_encode(_public_bytes(self.vapid_key.public_key()))
+        self.vapid_subject = vapid_subject
+        self.ttl = ttl
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport = transport
+        self.http2 = http2
+        self.keepalive_expiry = keepalive_expiry
+        self._loop = None
+        self._client = None
+        self._subscription_keys = LRUCache(maxsize=200000, timeout=24 * 3600)
+        self._vapid_headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_client(self):
+        if self._client is None:
+            limits = httpx.Limits(
+                max_connections=None, max_keepalive_connections=None, keepalive_expiry=self.keepalive_expiry,
+            )
+            self._client = httpx.AsyncClient(
+                http2=self.http2, timeout=self.timeout, limits=limits, transport=self.transport,
+            )
+        return self._client
+
+    def close(self):
+        """Close the client's connections and the engine's event loop."""
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self._loop.run_until_complete(self._client.aclose())
+            self._client = None
+        self._loop.close()
+        self._loop = None
+
+    def subscription_keys(self, subscription):
+        cache_key = (subscription.pk, subscription.p256dh_key, subscription.auth_key)
+        keys = self._subscription_keys.get(cache_key)
+        if keys is None:
+            ua_public = b64url_decode(subscription.p256dh_key)
+            keys = (
+                ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), ua_public),
+                ua_public,
+                b64url_decode(subscription.auth_key),
+            )
+            self._subscription_keys.set(cache_key, keys)
+        return keys
+
+    def encrypt(self, subscription, payload):
+        """aes128gcm body for one message (RFC 8291 section 3.4)."""
+        ua_key, ua_public, auth_secret = self.subscription_keys(subscription)
+        as_private = ec.generate_private_key(ec.SECP256R1())
+        as_public = _public_bytes(as_private.public_key())
+
+        ecdh_secret = as_private.exchange(ec.ECDH(), ua_key)
+        ikm = _hkdf(auth_secret, ecdh_secret, b'WebPush: info\x00' + ua_public + as_public, 32)
+        salt = os.urandom(16)
+        cek = _hkdf(salt, ikm, b'Content-Encoding: aes128gcm\x00', 16)
+        nonce = _hkdf(salt, ikm, b'Content-Encoding: nonce\x00', 12)
+
+        ciphertext = AESGCM(cek).encrypt(nonce, payload + b'\x02', None)
+        header = salt + struct.pack('!IB', RECORD_SIZE, len(as_public)) + as_public
+        return header + ciphertext
+
+    def vapid_header(self, origin):
+        cached = self._vapid_headers.get(origin)
+        now = int(time.time())
+        if cached and cached[0] - now > 3600:
+            return cached[1]
+
+        expires = now + VAPID_LIFETIME
+        header = b64url_encode(json.dumps({'typ': 'JWT', 'alg': 'ES256'}).encode())
+        claims = b64url_encode(json.dumps({'aud': origin, 'exp': expires, 'sub': self.vapid_subject}).encode())
+        signing_input = f'{header}.{claims}'.encode()
+        r, s = decode_dss_signature(self.vapid_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+        signature = b64url_encode(r.to_bytes(32, 'big') + s.to_bytes(32, 'big'))
+        value = f'vapid t={header}.{claims}.{signature}, k={self.vapid_public}'
+        self._vapid_headers[origin] = (expires, value)
+        return value
+
+    async def _send_one(self, client, semaphore, origin, subscription, payload):
+        body = self.encrypt(subscription, json.dumps(payload).encode())
+        headers = {
+            'Authorization': self.vapid_header(origin),
+            'Content-Encoding': 'aes128gcm',
+            'Content-Type': 'application/octet-stream',
+            'TTL': str(self.ttl),
+            'Urgency': 'high',
+        }
+
+        status = None
+        for attempt in range(1, self.max_retries + 2):
+            retry_after = None
+            async with semaphore:
+                try:
+                    response = await client.post(subscription.endpoint, content=body, headers=headers)
+                    status = response.status_code
+                    retry_after = response.headers.get('Retry-After')
+                except httpx.HTTPError as exc:
+                    logger.warning('Push to %s failed: %s', origin, exc)
+                    status = None
+
+            if status is not None and status not in RETRY_STATUSES:
+                return PushResult(subscription, status, attempt)
+            if attempt > self.max_retries:
+                break
+
+            delay = self.backoff * (2 ** (attempt - 1)) * (1 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            await asyncio.sleep(delay)
+        return PushResult(subscription, status, attempt)
+
+    async def send_many(self, jobs):
+        """Send ``[(subscription, payload dict), ...]``; returns a PushResult per job."""
+        by_origin = defaultdict(list)
+        for subscription, payload in jobs:
+            parts = urlsplit(subscription.endpoint)
+            by_origin[f'{parts.scheme}://{parts.netloc}'].append((subscription, payload))
+
+        client = self._get_client()
+        tasks = []
+        for origin, origin_jobs in by_origin.items():
+            semaphore = asyncio.Semaphore(self.max_per_host)
+            tasks.extend(
+                self._send_one(client, semaphore, origin, subscription, payload)
+                for subscription, payload in origin_jobs
+            )
+        return await asyncio.gather(*tasks)
+
+    def deliver(self, jobs):
+        """Blocking entry point: send everything, prune dead endpoints, return the results."""
+        if not jobs:
+            return []
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        results = self._loop.run_until_complete(self.send_many(jobs))
+        prune_dead_subscriptions(results)
+        return results
+
+
+def prune_dead_subscriptions(results):
+    dead = [result.subscription.pk for result in results if result.status in DEAD_STATUSES]
+    if dead:
+        PushSubscription.objects.filter(pk__in=dead).delete()
+    return len(dead)
+
+
+class NullPushEngine:
+    """Stands in for PushEngine when no VAPID key is configured: sends nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+    def deliver(self, jobs):
+        return []
+
+
+def get_push_engine(**overrides):
+    """
+    A PushEngine built from ``settings.WEB_PUSH`` plus ``overrides``. Without
+    a VAPID private key web pushes are skipped (NullPushEngine), so the
+    dispatcher still writes the in-app Notification rows.
+    """
+    options = dict(settings.WEB_PUSH)
+    options.update(overrides)
+    if not options.get('VAPID_PRIVATE_KEY', '').strip():
+        logger.warning("WEB_PUSH['VAPID_PRIVATE_KEY'] is not set; web pushes are disabled.")
+        return NullPushEngine()
+    return PushEngine(
+        vapid_private_key=options['VAPID_PRIVATE_KEY'],
+        vapid_subject=options['VAPID_SUBJECT'],
+        ttl=options.get('TTL', 3600),
+        max_per_host=options.get('MAX_PER_HOST', 100),
+        max_retries=options.get('MAX_RETRIES', 3),
+        transport=options.get('TRANSPORT'),
+        http2=options.get('HTTP2', True),
+    )
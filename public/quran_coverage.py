@@ -0,0 +1,93 @@
+import base64
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from .cache import is_process_local
+from .models import QuranProgress
+from .quran_index import JUZ_COUNT, PAGE_COUNT, page_juz
+
+PAGE_COUNTS_TIMEOUT = 24 * 3600
+# A process-local cache cannot be invalidated from other workers, so its
+# entries are only kept long enough to absorb repeated reads.
+PAGE_COUNTS_LOCAL_TIMEOUT = 30
+MAX_GAPS = 100
+
+PAGE_JUZ = page_juz(np.arange(1, PAGE_COUNT + 1)) - 1
+JUZ_SIZES = np.bincount(PAGE_JUZ, minlength=JUZ_COUNT)
+
+
+def _page_counts_key(user_id):
+    return f'quran_page_counts:{user_id}'
+
+
+def _coverage_cache():
+    return caches[getattr(settings, 'QURAN_COVERAGE_CACHE', 'default')]
+
+
+def load_page_counts(user_id):
+    """Times each page was read, as a uint16 array indexed by page - 1."""
+    counts = np.zeros(PAGE_COUNT, dtype=np.uint16)
+    rows = (
+        QuranProgress.objects.filter(user_id=user_id, page_number__range=(1, PAGE_COUNT))
+        .values_list('page_number').annotate(reads=Count('id')).order_by()
+    )
+    for page, reads in rows:
+        counts[page - 1] = min(reads, np.iinfo(np.uint16).max)
+    return counts
+
+
+def get_page_counts(user_id):
+    """
+    The user's per-page read counts from the cache (1208 bytes), loaded with
+    one GROUP BY on a miss. Writers drop the entry through
+    ``invalidate_page_counts``, so the next read reloads exact counts.
+    """
+    cache = _coverage_cache()
+    cached = cache.get(_page_counts_key(user_id))
+    if cached is not None:
+        return np.frombuffer(cached, dtype=np.uint16).copy()
+    counts = load_page_counts(user_id)
+    timeout = PAGE_COUNTS_LOCAL_TIMEOUT if is_process_local(cache) else PAGE_COUNTS_TIMEOUT
+    cache.add(_page_counts_key(user_id), counts.tobytes(), timeout)
+    return counts
+
+
+def invalidate_page_counts(user_id):
+    _coverage_cache().delete(_page_counts_key(user_id))
+
+
+def unread_ranges(read):
+    """``[[first, last], ...]`` page runs not yet read, in page order."""
+    edges = np.diff(np.concatenate(([1], read.astype(np.int8), [1])))
+    starts = np.flatnonzero(edges == -1) + 1
+    ends = np.flatnonzero(edges == 1)
+    return np.column_stack((starts, ends)).tolist()
+
+
+def summarize(counts, index=None):
+    """Coverage, khatm count, per-juz completion and gaps for one user's page counts."""
+    read = counts > 0
+    khatm_count = int(counts.min())
+    # Pages read once more than the completed khatms, i.e. the current round
+    current_round = counts > khatm_count
+    per_juz = np.bincount(PAGE_JUZ, weights=read, minlength=JUZ_COUNT) / JUZ_SIZES
+    gaps = unread_ranges(read)
+
+    summary = {
+        'pages_read': int(read.sum()),
+        'pages_total': PAGE_COUNT,
+        'coverage_percent': round(float(read.mean()) * 100, 2),
+        'khatm_count': khatm_count,
+        'current_khatm_percent': round(float(current_round.mean()) * 100, 2),
+        'juz_completion': [round(float(value) * 100, 2) for value in per_juz],
+        'gap_count': len(gaps),
+        'gaps': gaps[:MAX_GAPS],
+        'next_unread_page': gaps[0][0] if gaps else None,
+        'bitset': base64.b64encode(np.packbits(read).tobytes()).decode(),
+    }
+    if index is not None:
+        summary['verse_coverage_percent'] = index.coverage(np.flatnonzero(read) + 1)['verses']
+    return summary
@@ -0,0 +1,165 @@
+"""
+Array-backed index of the 6236 verses of the Madani mushaf (604 pages),
+built from the cached chapter list.
+
+Verse numbering, surah page ranges and juz are exact. Chapter data only
+carries each surah's first and last page, so a verse's page is known only
+when the chapter's ``pages`` list has one entry per verse, the surah fits on
+one page, or the verse opens or closes its surah. Other verses get an
+estimated page, spread linearly over the surah's range, which is used for
+coverage estimates but never reported as the verse's page. Hizb is given
+only with a known page, as the half of the verse's juz that page falls in.
+"""
+import json
+import threading
+
+import numpy as np
+
+from .quran_metadata import quran_metadata
+
+SURAH_COUNT = 114
+VERSE_COUNT = 6236
+PAGE_COUNT = 604
+JUZ_COUNT = 30
+
+# (surah, verse) where each juz begins
+JUZ_STARTS = (
+    (1, 1), (2, 142), (2, 253), (3, 93), (4, 24), (4, 148), (5, 82), (6, 111), (7, 88), (8, 41),
+    (9, 93), (11, 6), (12, 53), (15, 1), (17, 1), (18, 75), (21, 1), (23, 1), (25, 21), (27, 56),
+    (29, 46), (33, 31), (36, 28), (39, 32), (41, 47), (46, 1), (51, 31), (58, 1), (67, 1), (78, 1),
+)
+
+
+def juz_first_page(juz):
+    """First page of each juz: 1, then every 20 pages from page 22."""
+    juz = np.asarray(juz)
+    return np.where(juz == 1, 1, 20 * juz - 18)
+
+
+def page_juz(pages):
+    pages = np.asarray(pages)
+    return np.where(pages <= 21, 1, np.minimum(JUZ_COUNT, (pages - 2) // 20 + 1))
+
+
+def page_hizb(pages, juz=None):
+    """Hizb of each page (two 10-page halves per juz), within ``juz`` when given."""
+    pages = np.asarray(pages)
+    juz = page_juz(pages) if juz is None else np.asarray(juz)
+    return 2 * juz - 1 + (pages >= juz_first_page(juz) + 10)
+
+
+class QuranIndex:
+    """
+    Per-verse ``surah``, ``page``, ``juz`` and ``hizb`` as parallel NumPy
+    arrays indexed by global verse number (0-based), plus per-surah offsets
+    and page ranges. ``page_exact`` marks verses whose page is known rather
+    than estimated. Lookups are O(1); page -> verse range is a bisect.
+    """
+
+    def __init__(self, chapters, version=None):
+        chapters = sorted(chapters, key=lambda chapter: chapter['id'])
+        self.version = version
+        self.verses_count = np.array([chapter['verses_count'] for chapter in chapters], dtype=np.int32)
+        self.first_page = np.array([chapter['pages'][0] for chapter in chapters], dtype=np.int16)
+        self.last_page = np.array([chapter['pages'][-1] for chapter in chapters], dtype=np.int16)
+        self.offsets = np.concatenate(([0], np.cumsum(self.verses_count)))
+
+        self.verse_surah = np.repeat(np.arange(1, SURAH_COUNT + 1, dtype=np.uint8), self.verses_count)
+        position = np.arange(VERSE_COUNT) - self.offsets[self.verse_surah - 1]
+        span = (self.last_page - self.first_page + 1)[self.verse_surah - 1]
+        pages = self.first_page[self.verse_surah - 1] + position * span // self.verses_count[self.verse_surah - 1]
+        last = self.verses_count[self.verse_surah - 1] - 1
+        pages[position == last] = self.last_page[self.verse_surah[position == last] - 1]
+        self.page_exact = (span == 1) | (position == 0) | (position == last)
+        for surah, chapter in enumerate(chapters, start=1):
+            if len(chapter['pages']) == chapter['verses_count']:
+                pages[self.offsets[surah - 1]:self.offsets[surah]] = chapter['pages']
+                self.page_exact[self.offsets[surah - 1]:self.offsets[surah]] = True
+        self.verse_page = np.maximum.accumulate(pages).astype(np.int16)
+
+        juz_starts = [self.offsets[surah - 1] + verse - 1 for surah, verse in JUZ_STARTS]
+        self.verse_juz = np.searchsorted(juz_starts, np.arange(VERSE_COUNT), side='right').astype(np.uint8)
+        # Zero where the page is only estimated
+        self.verse_hizb = np.where(self.page_exact, page_hizb(self.verse_page, self.verse_juz), 0).astype(np.uint8)
+
+    @classmethod
+    def from_chapters(cls, chapters, version=None):
+        """None unless ``chapters`` describe the whole mushaf."""
+        if sorted(chapter['id'] for chapter in chapters) != list(range(1, SURAH_COUNT + 1)):
+            return None
+        if sum(chapter['verses_count'] for chapter in chapters) != VERSE_COUNT:
+            return None
+        if any(not isinstance(chapter['pages'], list) or not chapter['pages'] for chapter in chapters):
+            return None
+        return cls(chapters, version)
+
+    def verse_index(self, surah, verse):
+        if not 1 <= surah <= SURAH_COUNT or not 1 <= verse <= self.verses_count[surah - 1]:
+            return None
+        return int(self.offsets[surah - 1]) + verse - 1
+
+    def locate(self, surah, verse):
+        """
+        ``{'page', 'juz', 'hizb'}`` for a verse, or None if it does not exist.
+        ``page`` and ``hizb`` are None when the verse's page is not known.
+        """
+        index = self.verse_index(surah, verse)
+        if index is None:
+            return None
+        exact = bool(self.page_exact[index])
+        return {
+            'page': int(self.verse_page[index]) if exact else None,
+            'juz': int(self.verse_juz[index]),
+            'hizb': int(self.verse_hizb[index]) if exact else None,
+        }
+
+    def page_range(self, surah):
+        return int(self.first_page[surah - 1]), int(self.last_page[surah - 1])
+
+    def page_verses(self, page):
+        """
+        ``((surah, verse), (surah, verse))`` bounding ``page``, or None if the
+        page has no verses or its bounds rest on estimated pages.
+        """
+        start = int(np.searchsorted(self.verse_page, page, side='left'))
+        end = int(np.searchsorted(self.verse_page, page, side='right')) - 1
+        if start > end or not self.page_exact[max(start - 1, 0):end + 2].all():
+            return None
+        return tuple(
+            (int(self.verse_surah[i]), i - int(self.offsets[self.verse_surah[i] - 1]) + 1)
+            for i in (start, end)
+        )
+
+    def coverage(self, pages_read):
+        """
+        Percentage of pages and of verses covered by the page numbers in
+        ``pages_read``. Verses without a known page count by their estimated
+        page, so the verse figure is an estimate.
+        """
+        read = np.zeros(PAGE_COUNT + 1, dtype=bool)
+        pages = np.asarray(pages_read, dtype=np.int64)
+        read[pages[(pages >= 1) & (pages <= PAGE_COUNT)]] = True
+        return {
+            'pages': round(float(read[1:].mean()) * 100, 2),
+            'verses': round(float(read[self.verse_page].mean()) * 100, 2),
+        }
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_quran_index():
+    """
+    The index for the current chapter snapshot, rebuilt when the snapshot
+    changes. None while the cached chapter table is incomplete.
+    """
+    global _index
+    snapshot = quran_metadata.get('chapters')
+    index = _index
+    if index is not None and index[0] is snapshot:
+        return index[1]
+    with _lock:
+        if _index is None or _index[0] is not snapshot:
+            _index = (snapshot, QuranIndex.from_chapters(json.loads(snapshot.body), snapshot.version))
+        return _index[1]
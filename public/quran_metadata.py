@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import CachedChapters, CachedReciter, CacheMetadata
+
+CHAPTER_FIELDS = [
+    'id', 'revelation_place', 'revelation_order', 'bismillah_pre', 'name_simple', 'name_complex',
+    'name_arabic', 'verses_count', 'pages', 'translated_name',
+]
+RECITER_FIELDS = ['id', 'name', 'style', 'qirat', 'translated_name']
+
+# cache_type in CacheMetadata -> (model, fields, JSON-in-TextField columns)
+DATASETS = {
+    'chapters': (CachedChapters, CHAPTER_FIELDS, ('pages', 'translated_name')),
+    'reciters': (CachedReciter, RECITER_FIELDS, ('style', 'qirat', 'translated_name')),
+}
+
+
+def parse_json_text(value):
+    if not value:
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class Snapshot:
+    __slots__ = ('version', 'body', 'etag')
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()
+
+
+class QuranMetadataCache:
+    """
+    Process-wide snapshots of the cached Quran reference tables, held as
+    ready-to-send JSON bytes. A snapshot is rebuilt only when its
+    CacheMetadata.last_updated changes, and that timestamp is itself
+    checked at most once per ``check_interval`` seconds, so almost every
+    request is served without touching the database or the serializer.
+    ``max_age`` is the Cache-Control lifetime given to clients.
+    """
+
+    def __init__(self, check_interval=60, max_age=86400):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._snapshots = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+    def current_version(self, cache_type):
+        return CacheMetadata.objects.filter(cache_type=cache_type).values_list('last_updated', flat=True).first()
+
+    def build(self, cache_type, version):
+        model, fields, json_fields = DATASETS[cache_type]
+        rows = list(model.objects.order_by('id').values(*fields))
+        for row in rows:
+            for field in json_fields:
+                row[field] = parse_json_text(row[field])
+        body = json.dumps(rows, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+        return Snapshot(version, body)
+
+    def get(self, cache_type):
+        snapshot = self._snapshots.get(cache_type)
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at.get(cache_type, 0) < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(cache_type)
+            if snapshot is not None and now - self._checked_at.get(cache_type, 0) < self.check_interval:
+                return snapshot
+            version = self.current_version(cache_type)
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshots[cache_type] = self.build(cache_type, version)
+            self._checked_at[cache_type] = now
+        return snapshot
+
+    def invalidate(self, cache_type=None):
+        with self._lock:
+            if cache_type is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(cache_type, None)
+
+
+quran_metadata = QuranMetadataCache(**getattr(settings, 'QURAN_METADATA', {}))
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+
+import httpx
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import CacheMetadata
+from .quran_metadata import DATASETS, parse_json_text
+
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def normalize(cache_type, item):
+    """Upstream record -> model field values, JSON columns as canonical text."""
+    _, fields, json_fields = DATASETS[cache_type]
+    values = {}
+    for field in fields:
+        if field in json_fields:
+            value = item.get(field)
+            if isinstance(value, str):
+                value = parse_json_text(value)
+            values[field] = canonical_json({} if value is None else value)
+        else:
+            values[field] = item[field]
+    return values
+
+
+def content_hash(values):
+    return hashlib.sha256(canonical_json(values).encode()).hexdigest()
+
+
+def stored_hashes(cache_type):
+    model, fields, _ = DATASETS[cache_type]
+    return {
+        row['id']: content_hash(normalize(cache_type, row))
+        for row in model.objects.values(*fields).iterator()
+    }
+
+
+async def _fetch_page(client, semaphore, url, page):
+    async with semaphore:
+        response = await client.get(url, params={'page': page})
+        response.raise_for_status()
+        return response.json()
+
+
+async def fetch_dataset(client, semaphore, base_url, cache_type):
+    """
+    Read ``{base_url}/{cache_type}``. When the first page reports
+    ``pagination.total_pages``, the remaining pages are fetched concurrently.
+    """
+    url = f"{base_url.rstrip('/')}/{cache_type}"
+    first = await _fetch_page(client, semaphore, url, 1)
+    total_pages = (first.get('pagination') or {}).get('total_pages') or 1
+    rest = await asyncio.gather(*(
+        _fetch_page(client, semaphore, url, page) for page in range(2, total_pages + 1)
+    ))
+    return [item for payload in [first, *rest] for item in payload[cache_type]]
+
+
+async def fetch_all(base_url, cache_types, concurrency=8, timeout=30.0, transport=None):
+    """Fetch every dataset at once, with at most ``concurrency`` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=timeout, transport=transport) as client:
+        results = await asyncio.gather(*(
+            fetch_dataset(client, semaphore, base_url, cache_type) for cache_type in cache_types
+        ))
+    return dict(zip(cache_types, results))
+
+
+def load_file(path, cache_types):
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    return {cache_type: payload.get(cache_type, []) for cache_type in cache_types}
+
+
+def apply_dataset(cache_type, items, prune=False, batch_size=500):
+    """
+    Write the upstream ``items`` for one dataset, touching only rows whose
+    content hash changed. New and changed rows go out in one
+    bulk_create(update_conflicts=True); CacheMetadata is updated in the same
+    transaction, and last_updated only moves when something changed.
+    """
+    model, fields, _ = DATASETS[cache_type]
+    incoming = {}
+    for item in items:
+        values = normalize(cache_type, item)
+        incoming[values['id']] = values
+    existing = stored_hashes(cache_type)
+    changed = {pk: values for pk, values in incoming.items() if existing.get(pk) != content_hash(values)}
+    removed = set(existing) - set(incoming) if prune else set()
+    created = sum(1 for pk in changed if pk not in existing)
+
+    now = timezone.now()
+    rows = [model(**values, created_at=now, updated_at=now) for values in changed.values()]
+    update_fields = [field for field in fields if field != 'id'] + ['updated_at']
+    with transaction.atomic():
+        if connection.features.supports_update_conflicts_with_target:
+            model.objects.bulk_create(
+                rows, batch_size=batch_size, update_conflicts=True, unique_fields=['id'], update_fields=update_fields,
+            )
+        else:
+            model.objects.bulk_create([row for row in rows if row.pk not in existing], batch_size=batch_size)
+            model.objects.bulk_update([row for row in rows if row.pk in existing], update_fields, batch_size=batch_size)
+        if removed:
+            model.objects.filter(pk__in=removed).delete()
+
+        metadata = CacheMetadata.objects.select_for_update().filter(cache_type=cache_type).first()
+        total = len(existing) - len(removed) + created
+        if metadata is None:
+            CacheMetadata.objects.create(cache_type=cache_type, last_updated=now, total_records=total, created_at=now)
+        elif changed or removed or metadata.total_records != total:
+            metadata.total_records = total
+            if changed or removed:
+                metadata.last_updated = now
+            metadata.save(update_fields=['total_records', 'last_updated'])
+
+    return {
+        'created': created,
+        'updated': len(changed) - created,
+        'unchanged': len(incoming) - len(changed),
+        'deleted': len(removed),
+    }
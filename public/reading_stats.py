@@ -0,0 +1,290 @@
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .leaderboards import leaderboard_index
+from .quran_coverage import invalidate_page_counts
+from .models import QuranProgress, QuranReadingDay, UserPreference, UserReadingStat
+from .serializers import cached_user_preference
+from .upsert import update_or_insert
+
+
+def get_zone(name):
+    try:
+        return ZoneInfo(name) if name else dt_timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return dt_timezone.utc
+
+
+def user_zone(user_id):
+    data = cached_user_preference(user_id)['data'] or {}
+    return get_zone(data.get('timezone'))
+
+
+def reading_day(completed_at, zone):
+    """The user's local calendar date for a completion instant."""
+    return timezone.localtime(completed_at, zone).date()
+
+
+def apply_reading_day(user_id, day, pages=1, seconds=0):
+    """Add to the user's QuranReadingDay rollup row for local date ``day``."""
+    now = timezone.now()
+    update_or_insert(
+        QuranReadingDay,
+        dict(user_id=user_id, day=day),
+        dict(pages_read=F('pages_read') + pages, reading_time_seconds=F('reading_time_seconds') + (seconds or 0), updated_at=now),
+        dict(pages_read=pages, reading_time_seconds=seconds or 0, updated_at=now),
+    )
+
+
+def apply_reading(user_id, day, pages=1, seconds=0):
+    """
+    Fold ``pages``/``seconds`` read on local date ``day`` into the user's
+    UserReadingStat with one UPDATE, whatever their history length:
+
+    - same day as last_reading_date: streak unchanged
+    - the day after: streak + 1 (longest_streak raised to match)
+    - any later day: streak restarts at 1
+    - an earlier day (late offline sync): totals only; rebuild_reading_stats
+      recomputes the streak exactly.
+
+    All right-hand sides see the row's pre-update values, so the CASEs agree.
+    The day's QuranReadingDay rollup row is bumped alongside.
+    """
+    now = timezone.now()
+    previous_day = day - timedelta(days=1)
+    streak = Case(
+        When(last_reading_date__isnull=True, then=Value(1)),
+        When(last_reading_date=previous_day, then=Coalesce(F('current_streak'), 0) + 1),
+        When(last_reading_date__lt=previous_day, then=Value(1)),
+        default=F('current_streak'),
+    )
+    changes = dict(
+        total_pages_read=Coalesce(F('total_pages_read'), 0) + pages,
+        total_reading_time_seconds=Coalesce(F('total_reading_time_seconds'), 0) + (seconds or 0),
+        current_streak=streak,
+        # CASE rather than GREATEST(), which SQL Server only has from 2022
+        longest_streak=Case(
+            When(Q(longest_streak__isnull=True) | Q(longest_streak__lt=streak), then=streak),
+            default=F('longest_streak'),
+        ),
+        last_reading_date=Case(
+            When(Q(last_reading_date__isnull=True) | Q(last_reading_date__lt=day), then=Value(day)),
+            default=F('last_reading_date'),
+        ),
+        updated_at=now,
+    )
+    update_or_insert(UserReadingStat, dict(user_id=user_id), changes, dict(
+        total_pages_read=pages,
+        total_reading_time_seconds=seconds or 0,
+        current_streak=1,
+        longest_streak=1,
+        last_reading_date=day,
+        created_at=now,
+        updated_at=now,
+    ))
+    apply_reading_day(user_id, day, pages, seconds)
+
+
+def record_progress(progress):
+    zone = user_zone(progress.user_id)
+    apply_reading(progress.user_id, reading_day(progress.completed_at, zone), 1, progress.reading_time_seconds)
+    leaderboard_index.refresh_user(progress.user_id)
+    # After commit, so a concurrent reader cannot re-cache the pre-insert counts
+    transaction.on_commit(lambda: invalidate_page_counts(progress.user_id))
+
+
+def _zone_progress(zone_name, zone_names):
+    """QuranProgress of users in one timezone (None: users without a known one)."""
+    progress = QuranProgress.objects.all()
+    if zone_name is None:
+        return progress.exclude(user__preferences__timezone__in=zone_names)
+    return progress.filter(user__preferences__timezone=zone_name)
+
+
+def _daily_totals(progress, zone_name):
+    """Per (user, local day) page and time totals."""
+    return (
+        progress
+        .annotate(day=TruncDate('completed_at', tzinfo=get_zone(zone_name)))
+        .values('user_id', 'day')
+        .annotate(pages=Count('*'), seconds=Coalesce(Sum('reading_time_seconds'), 0))
+        .order_by('user_id', 'day')
+    )
+
+
+def _fold_days(rows):
+    """Collapse ordered (user, day) totals into one stats tuple per user."""
+    user_id, stats = None, None
+    for row in rows:
+        if row['user_id'] != user_id:
+            if user_id is not None:
+                yield user_id, stats
+            user_id = row['user_id']
+            stats = {'pages': 0, 'seconds': 0, 'current': 0, 'longest': 0, 'last': None}
+        if stats['last'] is not None and row['day'] == stats['last'] + timedelta(days=1):
+            stats['current'] += 1
+        else:
+            stats['current'] = 1
+        stats['longest'] = max(stats['longest'], stats['current'])
+        stats['last'] = row['day']
+        stats['pages'] += row['pages']
+        stats['seconds'] += row['seconds']
+    if user_id is not None:
+        yield user_id, stats
+
+
+def _rebuild_users(user_ids, zone_name, zone_names, batch_size):
+    """
+    Rebuild stats and QuranReadingDay rows for ``user_ids`` in one
+    transaction. Their stats rows are locked first, so ingests for these
+    users wait, and the old rollup rows are replaced in the same commit.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        existing = dict(
+            UserReadingStat.objects.select_for_update().filter(user_id__in=user_ids).values_list('user_id', 'id')
+        )
+        rows = list(_daily_totals(_zone_progress(zone_name, zone_names).filter(user_id__in=user_ids), zone_name))
+        to_update, to_create = [], []
+        for user_id, stats in _fold_days(rows):
+            stat = UserReadingStat(
+                id=existing.get(user_id) or uuid.uuid4(),
+                user_id=user_id,
+                total_pages_read=stats['pages'],
+                total_reading_time_seconds=stats['seconds'],
+                current_streak=stats['current'],
+                longest_streak=stats['longest'],
+                last_reading_date=stats['last'],
+                created_at=now,
+                updated_at=now,
+            )
+            (to_update if user_id in existing else to_create).append(stat)
+        UserReadingStat.objects.bulk_update(to_update, [
+            'total_pages_read', 'total_reading_time_seconds', 'current_streak',
+            'longest_streak', 'last_reading_date', 'updated_at',
+        ], batch_size=batch_size)
+        UserReadingStat.objects.bulk_create(to_create, batch_size=batch_size)
+
+        QuranReadingDay.objects.filter(user_id__in=user_ids).delete()
+        QuranReadingDay.objects.bulk_create([
+            QuranReadingDay(
+                user_id=row['user_id'], day=row['day'], pages_read=row['pages'],
+                reading_time_seconds=row['seconds'], updated_at=now,
+            )
+            for row in rows
+        ], batch_size=batch_size)
+    return len(to_update) + len(to_create)
+
+
+def rebuild_reading_stats(batch_size=1000):
+    """
+    Recompute every user's stats and QuranReadingDay rollup from
+    QuranProgress, ``batch_size`` users per transaction: one GROUP BY
+    (user, local day) query per batch with the batch's timezone, a single
+    ordered pass to derive streaks, then bulk_update/bulk_create. Rollup
+    rows are replaced per batch, so readers never see them missing.
+    Returns the number of users.
+    """
+    zone_names = list(
+        UserPreference.objects.exclude(timezone__isnull=True).exclude(timezone='')
+        .values_list('timezone', flat=True).distinct()
+    )
+    total = 0
+    for zone_name in [None] + zone_names:
+        user_ids = list(
+            _zone_progress(zone_name, zone_names).order_by('user_id').values_list('user_id', flat=True).distinct()
+        )
+        for start in range(0, len(user_ids), batch_size):
+            total += _rebuild_users(user_ids[start:start + batch_size], zone_name, zone_names, batch_size)
+    # Rollups of users whose progress is gone entirely
+    QuranReadingDay.objects.exclude(user_id__in=QuranProgress.objects.values('user_id')).delete()
+    return total
+
+
+def lock_reading_stat(user_id):
+    """
+    Lock the user's UserReadingStat row for the current transaction,
+    creating an empty one first if needed, so that writers for one user
+    run one at a time.
+    """
+    locked = UserReadingStat.objects.select_for_update().filter(user_id=user_id)
+    if list(locked.values_list('pk', flat=True)):
+        return
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            UserReadingStat.objects.create(
+                user_id=user_id, total_pages_read=0, total_reading_time_seconds=0,
+                current_streak=0, longest_streak=0, created_at=now, updated_at=now,
+            )
+    except IntegrityError:
+        # Created concurrently; wait for that transaction's lock instead
+        list(locked.values_list('pk', flat=True))
+
+
+def ingest_progress(user_id, entries):
+    """
+    Store a batch of offline-read pages and fold them into the user's stats.
+
+    Entries are deduplicated on (session_id, page_number) within the batch and
+    against stored rows, inserted with one bulk_create, then applied to
+    UserReadingStat once per local day in date order. The user's stats row
+    is locked throughout, so retries of the same sync running at once are
+    serialized and the second one finds the pages already stored; only rows
+    that were actually inserted are counted. Returns the number of rows
+    created.
+    """
+    batch = {}
+    for entry in entries:
+        batch.setdefault((entry['session_id'], entry['page_number']), entry)
+    now = timezone.now()
+
+    with transaction.atomic():
+        lock_reading_stat(user_id)
+        stored = set(
+            QuranProgress.objects.filter(user_id=user_id, session_id__in={session for session, _ in batch})
+            .values_list('session_id', 'page_number')
+        )
+        rows = [
+            QuranProgress(
+                user_id=user_id,
+                surah_number=entry['surah_number'],
+                page_number=entry['page_number'],
+                completed_at=entry.get('completed_at') or now,
+                reading_time_seconds=entry.get('reading_time_seconds') or 0,
+                session_id=entry['session_id'],
+                created_at=now,
+            )
+            for key, entry in batch.items() if key not in stored
+        ]
+        if not rows:
+            return 0
+
+        # bulk_create sends no post_save, so record_progress does not run per row
+        if connection.features.supports_ignore_conflicts:
+            QuranProgress.objects.bulk_create(rows, ignore_conflicts=True)
+            # A single-page save outside this lock may have stored a pair first
+            inserted = set(QuranProgress.objects.filter(pk__in=[row.pk for row in rows]).values_list('pk', flat=True))
+            rows = [row for row in rows if row.pk in inserted]
+        else:
+            QuranProgress.objects.bulk_create(rows)
+
+        zone = user_zone(user_id)
+        days = {}
+        for row in rows:
+            totals = days.setdefault(reading_day(row.completed_at, zone), [0, 0])
+            totals[0] += 1
+            totals[1] += row.reading_time_seconds
+        for day in sorted(days):
+            apply_reading(user_id, day, *days[day])
+
+    if rows:
+        leaderboard_index.refresh_user(user_id)
+        transaction.on_commit(lambda: invalidate_page_counts(user_id))
+    return len(rows)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import GroupChatConsumer
+
+websocket_urlpatterns = [
+    path('ws/groups/<uuid:group_id>/chat/', GroupChatConsumer.as_asgi()),
+]
@@ -1,6 +1,11 @@
 from rest_framework import serializers
-from .models import UserPreference
+from .models import UserPreference, CommunityPost, PostCategory, UserProfileCommunity, PalMessage, PrayerPalConnection, Notification, QuranProgress, QuranReadingDay, UserPrayerSummary, VerseBookmark
+from .cache import preference_cache, make_etag
+from .prayer_times import PRAYERS
+from .leaderboards import ORDERINGS
+from .quran_index import get_quran_index
 from django.utils import timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class UserPreferenceSerializer(serializers.ModelSerializer):
     
@@ -8,12 +13,199 @@ class UserPreferenceSerializer(serializers.ModelSerializer):
         model = UserPreference
         exclude = ['created_at', 'updated_at', 'user']
 
+    def validate_timezone(self, value):
+        if value:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise serializers.ValidationError("Unknown timezone")
+        return value
+
     def create(self, validated_data):
-        validated_data['created_at'] = timezone.now()
-        validated_data['updated_at'] = timezone.now()
-        return super().create(validated_data)
+        validated_data['created_at'] = validated_data['updated_at'] = timezone.now()
+        instance = super().create(validated_data)
+        preference_cache.delete(instance.user_id)
+        return instance
 
     def update(self, instance, validated_data):
         validated_data['updated_at'] = timezone.now()
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        preference_cache.delete(instance.user_id)
+        return instance
+
+
+def load_user_preference(user_id):
+    preference = UserPreference.objects.filter(user_id=user_id).first()
+    data = dict(UserPreferenceSerializer(preference).data) if preference else None
+    return {'etag': make_etag(data), 'data': data}
+
+
+def cached_user_preference(user_id):
+    """``{'etag': ..., 'data': serialized preferences or None}`` from the preference cache."""
+    return preference_cache.get_or_set(user_id, lambda: load_user_preference(user_id))
+
+
+class PostCategorySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = PostCategory
+        fields = ['id', 'name', 'icon_name']
+
+
+class CommunityAuthorSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = UserProfileCommunity
+        fields = ['id', 'display_name', 'is_verified_subscriber']
+
+
+class CommunityFeedPostSerializer(serializers.ModelSerializer):
+    category = PostCategorySerializer(source='category_id', read_only=True)
+    author = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CommunityPost
+        fields = [
+            'id', 'title', 'content', 'is_anonymous', 'is_pinned', 'created_at', 'updated_at',
+            'category', 'author', 'reaction_count', 'support_count', 'comment_count',
+        ]
+        read_only_fields = ['reaction_count', 'support_count', 'comment_count']
+
+    def get_author(self, post):
+        if post.is_anonymous or post.community_profile_id is None:
+            return None
+        return CommunityAuthorSerializer(post.community_profile_id).data
+
+
+class PalMessageSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = PalMessage
+        fields = '__all__'
+
+
+class PrayerPalConnectionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = PrayerPalConnection
+        fields = '__all__'
+
+
+class PalMarkReadSerializer(serializers.Serializer):
+    up_to = serializers.UUIDField(help_text='Mark this message and everything before it as read.')
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'notification_type', 'title', 'message', 'data', 'read_status', 'created_at']
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+
+
+def check_surah_page(index, surah_number, page_number):
+    first, last = index.page_range(surah_number)
+    if not first <= page_number <= last:
+        raise serializers.ValidationError({'page_number': f'Surah {surah_number} spans pages {first}-{last}.'})
+
+
+class QuranProgressEntrySerializer(serializers.ModelSerializer):
+    surah_number = serializers.IntegerField(min_value=1, max_value=114)
+    page_number = serializers.IntegerField(min_value=1, max_value=604)
+    reading_time_seconds = serializers.IntegerField(min_value=0, required=False, default=0)
+    session_id = serializers.UUIDField()
+
+    class Meta:
+        model = QuranProgress
+        fields = ['surah_number', 'page_number', 'completed_at', 'reading_time_seconds', 'session_id']
+
+    def validate(self, attrs):
+        index = get_quran_index()
+        if index is not None:
+            check_surah_page(index, attrs['surah_number'], attrs['page_number'])
+        return attrs
+
+
+class QuranProgressSyncSerializer(serializers.Serializer):
+    entries = serializers.ListField(child=QuranProgressEntrySerializer(), allow_empty=False, max_length=1000)
+
+
+class QuranReadingDaySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = QuranReadingDay
+        fields = ['day', 'pages_read', 'reading_time_seconds']
+
+
+class DateRangeSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    max_days = 366
+
+    def validate(self, attrs):
+        start, end = attrs.get('start'), attrs.get('end')
+        if start and end:
+            if start > end:
+                raise serializers.ValidationError('start must not be after end.')
+            if (end - start).days >= self.max_days:
+                raise serializers.ValidationError(f'Range is limited to {self.max_days} days.')
+        return attrs
+
+
+class PrayerHistorySerializer(DateRangeSerializer):
+    group = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+
+
+class PrayerLogSerializer(serializers.Serializer):
+    prayer = serializers.ChoiceField(choices=PRAYERS)
+    date = serializers.DateField(required=False, help_text="Defaults to today in the user's timezone.")
+
+
+class UserPrayerSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = UserPrayerSummary
+        fields = ['date', 'completed_prayers', 'total_points']
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    by = serializers.ChoiceField(choices=ORDERINGS, default='streak')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class JoinRequestReviewSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+
+
+class VerseBookmarkSerializer(serializers.ModelSerializer):
+    surah_number = serializers.IntegerField(min_value=1, max_value=114)
+    verse_number = serializers.IntegerField(min_value=1, max_value=286)
+    page_number = serializers.IntegerField(min_value=1, max_value=604, required=False)
+
+    class Meta:
+        model = VerseBookmark
+        fields = ['id', 'surah_number', 'verse_number', 'page_number', 'bookmark_note', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        """
+        Check the verse exists and page_number lies in its surah. An omitted
+        page_number is filled only when the index knows the verse's page.
+        """
+        index = get_quran_index()
+        location = index.locate(attrs['surah_number'], attrs['verse_number']) if index is not None else None
+        if index is not None and location is None:
+            raise serializers.ValidationError({'verse_number': f'Surah {attrs["surah_number"]} has no such verse.'})
 
+        if 'page_number' in attrs:
+            if index is not None:
+                check_surah_page(index, attrs['surah_number'], attrs['page_number'])
+        elif location is not None and location['page'] is not None:
+            attrs['page_number'] = location['page']
+        else:
+            raise serializers.ValidationError({'page_number': 'This field is required.'})
+        return attrs
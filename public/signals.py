@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    AccountabilityGroup, CommunityComment, CommunityPost, CommunityReaction, PrayerReward, PrayerSupport,
+    QuranProgress,
+)
+from .groups import invalidate_invite_code
+from .prayer_log import invalidate_rewards
+from .reading_stats import record_progress
+
+
+@receiver(post_delete, sender=CommunityReaction)
+@receiver(post_delete, sender=CommunityComment)
+@receiver(post_delete, sender=PrayerSupport)
+def decrement_post_counter(sender, instance, using, origin=None, **kwargs):
+    # Skip cascades from deleting the post itself; its counters go with it.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is CommunityPost:
+        return
+    instance.bump_post_counter(-1, using=using)
+
+
+@receiver(post_save, sender=QuranProgress)
+def update_reading_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_progress(instance)
+
+
+@receiver(post_save, sender=PrayerReward)
+@receiver(post_delete, sender=PrayerReward)
+def invalidate_prayer_rewards(sender, **kwargs):
+    invalidate_rewards()
+
+
+@receiver(pre_save, sender=AccountabilityGroup)
+def remember_stored_invite_code(sender, instance, raw=False, **kwargs):
+    # A regenerated code must stop resolving, so note the code being replaced
+    if not raw and not instance._state.adding:
+        instance._stored_invite_code = (
+            AccountabilityGroup.objects.filter(pk=instance.pk).values_list('invite_code', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=AccountabilityGroup)
+@receiver(post_delete, sender=AccountabilityGroup)
+def invalidate_group_invite(sender, instance, **kwargs):
+    codes = {instance.invite_code, getattr(instance, '_stored_invite_code', None)} - {None}
+    instance._stored_invite_code = None
+
+    def clear_codes():
+        for code in codes:
+            invalidate_invite_code(code)
+
+    # Again after commit, so a read racing the save cannot re-cache the old row
+    clear_codes()
+    transaction.on_commit(clear_codes)
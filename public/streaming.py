@@ -0,0 +1,91 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .pagination import keyset_filter
+
+STREAM_CHUNK_SIZE = 500
+
+
+def _dumps(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def iter_json_array(rows):
+    """Yield a JSON array one element at a time."""
+    yield '['
+    first = True
+    for row in rows:
+        yield _dumps(row) if first else ',' + _dumps(row)
+        first = False
+    yield ']'
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield _dumps(row) + '\n'
+
+
+async def aiter_chunks(queryset, fields, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    ``queryset.values(*fields)`` as lists of at most ``chunk_size`` rows, one
+    keyset query per chunk, each run through ``sync_to_async``. The queryset
+    must be ordered, ending in a unique field.
+    """
+    ordering = [str(term) for term in queryset.query.order_by]
+    if not ordering:
+        raise ValueError('aiter_chunks needs an ordered queryset.')
+    keys = [term.lstrip('-') for term in ordering]
+    extra = [key for key in keys if key not in fields]
+    rows = queryset.values(*fields, *extra)
+    last = None
+    while True:
+        page = rows.filter(keyset_filter(ordering, last)) if last is not None else rows
+        chunk = await sync_to_async(list)(page[:chunk_size])
+        if not chunk:
+            return
+        last = [chunk[-1][key] for key in keys]
+        yield [{field: row[field] for field in fields} for row in chunk] if extra else chunk
+        if len(chunk) < chunk_size:
+            return
+
+
+async def aiter_encoded(chunks, ndjson=False):
+    """Async counterpart of iter_json_array/iter_ndjson, one string per chunk."""
+    if not ndjson:
+        yield '['
+    separator = ''
+    async for chunk in chunks:
+        if ndjson:
+            yield ''.join(_dumps(row) + '\n' for row in chunk)
+        else:
+            yield separator + ','.join(_dumps(row) for row in chunk)
+            separator = ','
+    if not ndjson:
+        yield ']'
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def stream_queryset(request, queryset, fields, ndjson=False, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream ``queryset.values(*fields)`` without materializing it.
+
+    Under WSGI rows come from ``iterator(chunk_size=...)`` (a server-side
+    cursor where the backend supports one). Under ASGI Django would drain a
+    sync iterator into a list before sending anything, so the body is an
+    async iterator reading one keyset chunk at a time instead; the queryset
+    must then be ordered on a sequence ending in a unique field.
+    """
+    content_type = 'application/x-ndjson' if ndjson else 'application/json'
+    if is_asgi(request):
+        content = aiter_encoded(aiter_chunks(queryset, fields, chunk_size), ndjson)
+    else:
+        rows = queryset.values(*fields).iterator(chunk_size=chunk_size)
+        content = iter_ndjson(rows) if ndjson else iter_json_array(rows)
+    return StreamingHttpResponse(content, content_type=content_type)
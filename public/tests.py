@@ -1,3 +1,929 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import struct
+import tempfile
+import threading
+import uuid
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from custom_auth.models import AuthUsers
+from .chat import MessageBatcher
+from .counters import reconcile_post_counters
+from .groups import group_by_invite_code, review_join_requests
+from .leaderboards import GroupLeaderboard, LeaderboardIndex
+from .management.commands.run_push_standin import StandInPushHandler
+from .models import (
+    AccountabilityGroup, CachedChapters, CachedReciter, CacheMetadata, ChallengeGroupMember, ChatHistory, CommunityPost, CommunityReaction, GroupChatParticipant,
+    GroupChatMessage, GroupJoinRequest, Notification, NotificationSchedule, PrayerReward, PrayerSupport, PushSubscription,
+    QuranProgress, QuranReadingDay, UserPrayerPeriodSummary, UserPreference, UserProfile, UserReadingStat,
+)
+from .notifications import (
+    CLAIM_LEASE, _unread_key, adjust_unread_count, claim_due_schedules, dispatch_batch, get_unread_count,
+    run_dispatcher, schedule_prayer_reminders,
+)
+from .prayer_log import invalidate_rewards, log_prayer, rebuild_prayer_periods
+from .push import NullPushEngine, PushEngine, _hkdf, _public_bytes, b64url_decode, b64url_encode, get_push_engine
+from .quran_coverage import get_page_counts, summarize, unread_ranges
+from .quran_index import VERSE_COUNT, QuranIndex
+from .quran_metadata import QuranMetadataCache, quran_metadata
+from .reading_stats import ingest_progress, rebuild_reading_stats
+from .routing import websocket_urlpatterns
+from .serializers import VerseBookmarkSerializer
+from .streaming import aiter_chunks
+from .upsert import update_or_insert
+
+
+def make_user(name=None):
+    name = name or f'user-{uuid.uuid4().hex[:8]}'
+    return AuthUsers.objects.create(username=name, email=f'{name}@example.com')
+
+
+def make_group(owner):
+    now = timezone.now()
+    profile = UserProfile.objects.create(user_id_fkey=owner, user_id=owner.pk, created_at=now, updated_at=now)
+    return AccountabilityGroup.objects.create(
+        user_profile=profile, name='group', created_at=now, updated_at=now, created_by=owner.pk,
+        invite_code=uuid.uuid4().hex[:15], daily_target_pages=4,
+    )
+
+
+def bearer(user):
+    return f'Bearer {RefreshToken.for_user(user).access_token}'
+
+
+def api_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=bearer(user))
+    return client
+
+
+class UpsertTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_upsert_inserts_then_updates_only_given_fields(self):
+        created = UserPreference.objects.upsert(self.user, daily_quran_goal=5)
+        self.assertEqual(created.daily_quran_goal, 5)
+        self.assertEqual(created.llm_provider, 'openai')
+
+        updated = UserPreference.objects.upsert(self.user, prayer_reminders=False)
+        self.assertEqual(updated.pk, created.pk)
+        self.assertFalse(updated.prayer_reminders)
+        self.assertEqual(updated.daily_quran_goal, 5)
+        self.assertEqual(UserPreference.objects.filter(user=self.user).count(), 1)
+
+    def test_update_or_insert_inserts_defaults_then_applies_changes(self):
+        today = timezone.now().date()
+        lookup = dict(user_id=self.user.pk, day=today)
+        changes = dict(pages_read=F('pages_read') + 2)
+        update_or_insert(QuranReadingDay, lookup, changes, dict(pages_read=2))
+        update_or_insert(QuranReadingDay, lookup, changes, dict(pages_read=2))
+        self.assertEqual(QuranReadingDay.objects.get(**lookup).pages_read, 4)
+
+    def test_preference_post_is_an_upsert(self):
+        client = api_client(self.user)
+        self.assertEqual(client.post('/public/user_preferences/', {'daily_quran_goal': 3}, format='json').status_code, 201)
+        self.assertEqual(client.post('/public/user_preferences/', {'daily_quran_goal': 7}, format='json').status_code, 201)
+        self.assertEqual(list(UserPreference.objects.filter(user=self.user).values_list('daily_quran_goal', flat=True)), [7])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = api_client(make_user())
+        now = timezone.now()
+        # Ties on created_at are broken by id, and pinned posts come first
+        self.posts = [
+            CommunityPost.objects.create(title=f'post {i}', content='...', created_at=now - timedelta(minutes=i // 2),
+                                         updated_at=now, is_pinned=(i == 4))
+            for i in range(7)
+        ]
+
+    def expected_order(self):
+        return [str(pk) for pk in CommunityPost.objects.order_by('-is_pinned', '-created_at', '-id').values_list('pk', flat=True)]
+
+    def walk(self, page_size):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            body = self.client.get('/public/community/feed/', params).json()
+            seen.extend(post['id'] for post in body['results'])
+            cursor = body['cursor']
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for page_size in (1, 2, 3, 7, 8):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self.walk(page_size), self.expected_order())
+
+    def test_last_full_page_has_no_cursor(self):
+        body = self.client.get('/public/community/feed/', {'page_size': 7}).json()
+        self.assertEqual(len(body['results']), 7)
+        self.assertIsNone(body['cursor'])
+        self.assertIsNone(body['next'])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get('/public/community/feed/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class PostCounterTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        now = timezone.now()
+        self.post = CommunityPost.objects.create(title='t', content='c', created_at=now, updated_at=now)
+
+    def test_counters_follow_inserts_and_deletes(self):
+        reaction = CommunityReaction.objects.create(user_id=self.user, post_id=self.post, reaction_type='like')
+        PrayerSupport.objects.create(post_id=self.post, supporter_user_id=self.user.pk)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.reaction_count, self.post.support_count), (1, 1))
+
+        reaction.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reaction_count, 0)
+
+    def test_reconcile_fixes_only_drifted_rows(self):
+        CommunityReaction.objects.create(user_id=self.user, post_id=self.post, reaction_type='heart')
+        CommunityPost.objects.filter(pk=self.post.pk).update(reaction_count=5, support_count=2)
+
+        fixed = reconcile_post_counters()
+        self.assertEqual(fixed, {'reaction_count': 1, 'comment_count': 0, 'support_count': 1})
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.reaction_count, self.post.support_count), (1, 0))
+        self.assertEqual(reconcile_post_counters([self.post.pk]), {'reaction_count': 0, 'comment_count': 0, 'support_count': 0})
+
+
+class StubPushEngine:
+    def __init__(self):
+        self.jobs = []
+
+    def deliver(self, jobs):
+        self.jobs.extend(jobs)
+        return []
+
+
+class NotificationDispatchTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.now = timezone.now()
+        self.schedules = [
+            NotificationSchedule.objects.create(
+                user_id=self.user, notification_type='prayer_fajr', scheduled_for=self.now - timedelta(minutes=1),
+            )
+            for _ in range(3)
+        ]
+        PushSubscription.objects.create(user=self.user, endpoint='https://push.example/1', p256dh_key='k', auth_key='a')
+
+    def test_claimed_rows_are_not_claimed_again_within_the_lease(self):
+        self.assertEqual(len(claim_due_schedules(10, now=self.now)), 3)
+        self.assertEqual(claim_due_schedules(10, now=self.now + CLAIM_LEASE - timedelta(seconds=1)), [])
+
+    def test_stale_claim_is_taken_over_and_only_the_new_owner_sends(self):
+        stale = claim_due_schedules(10, now=self.now)
+        fresh = claim_due_schedules(10, now=self.now + CLAIM_LEASE + timedelta(seconds=1))
+        self.assertEqual({s.pk for s in fresh}, {s.pk for s in self.schedules})
+
+        engine = StubPushEngine()
+        self.assertEqual(dispatch_batch(stale, engine)[0], 0)
+        self.assertEqual(engine.jobs, [])
+
+        self.assertEqual(dispatch_batch(fresh, engine)[0], 3)
+        self.assertEqual(len(engine.jobs), 3)
+        self.assertEqual(Notification.objects.filter(user_id=self.user).count(), 3)
+        self.assertFalse(NotificationSchedule.objects.filter(sent=False).exists())
+        self.assertEqual(claim_due_schedules(10, now=self.now + 3 * CLAIM_LEASE), [])
+
+    def test_run_dispatcher_drains_due_rows(self):
+        self.assertEqual(run_dispatcher(batch_size=2, engine=StubPushEngine()), 3)
+        self.assertEqual(get_unread_count(self.user.pk), 3)
+
+    @override_settings(WEB_PUSH={'VAPID_PRIVATE_KEY': '', 'VAPID_SUBJECT': 'mailto:admin@example.com'})
+    def test_missing_vapid_key_still_writes_notifications(self):
+        with self.assertLogs('public.push', 'WARNING'):
+            self.assertIsInstance(get_push_engine(), NullPushEngine)
+            self.assertEqual(run_dispatcher(batch_size=2), 3)
+        self.assertEqual(Notification.objects.filter(user_id=self.user).count(), 3)
+
+
+class PrayerReminderScheduleTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        UserPreference.objects.create(
+            user=self.user, prayer_reminders=True, notifications_enabled=True, latitude=21.42, longitude=39.83,
+        )
+        self.day = timezone.now().date() + timedelta(days=2)
+
+    def reminders(self, day):
+        return NotificationSchedule.objects.filter(target_date=day)
+
+    def test_each_day_is_regenerated_on_its_own(self):
+        next_day = self.day + timedelta(days=1)
+        self.assertEqual(schedule_prayer_reminders(self.day), 5)
+        self.assertEqual(schedule_prayer_reminders(next_day), 5)
+        self.assertEqual(schedule_prayer_reminders(self.day), 5)
+        self.assertEqual(self.reminders(self.day).count(), 5)
+        self.assertEqual(self.reminders(next_day).count(), 5)
+
+    def test_regeneration_keeps_sent_rows_and_drops_opted_out_users(self):
+        schedule_prayer_reminders(self.day)
+        self.reminders(self.day).filter(notification_type='prayer_fajr').update(sent=True)
+        UserPreference.objects.filter(user=self.user).update(prayer_reminders=False)
+
+        self.assertEqual(schedule_prayer_reminders(self.day), 0)
+        self.assertEqual(list(self.reminders(self.day).values_list('notification_type', flat=True)), ['prayer_fajr'])
+
+
+def decrypt_push(body, ua_private, auth_secret):
+    """Undo the aes128gcm encoding a user agent receives (RFC 8291 section 3.4)."""
+    salt, (record_size, key_length) = body[:16], struct.unpack('!IB', body[16:21])
+    as_public, ciphertext = body[21:21 + key_length], body[21 + key_length:]
+    ecdh_secret = ua_private.exchange(ec.ECDH(), ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), as_public))
+    ua_public = _public_bytes(ua_private.public_key())
+    ikm = _hkdf(auth_secret, ecdh_secret, b'WebPush: info\x00' + ua_public + as_public, 32)
+    cek = _hkdf(salt, ikm, b'Content-Encoding: aes128gcm\x00', 16)
+    nonce = _hkdf(salt, ikm, b'Content-Encoding: nonce\x00', 12)
+    plaintext = AESGCM(cek).decrypt(nonce, ciphertext, None)
+    return record_size, plaintext[:-1], plaintext[-1:]
+
+
+class PushEngineTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        vapid_key = ec.generate_private_key(ec.SECP256R1())
+        self.vapid_private = b64url_encode(vapid_key.private_numbers().private_value.to_bytes(32, 'big'))
+        self.ua_private = ec.generate_private_key(ec.SECP256R1())
+        self.auth_secret = b'0123456789abcdef'
+
+    def subscribe(self, endpoint):
+        return PushSubscription.objects.create(
+            user=self.user, endpoint=endpoint, auth_key=b64url_encode(self.auth_secret),
+            p256dh_key=b64url_encode(_public_bytes(self.ua_private.public_key())),
+        )
+
+    def engine(self, **options):
+        return PushEngine(self.vapid_private, 'mailto:admin@example.com', http2=False, backoff=0, **options)
+
+    def test_payload_decrypts_with_the_subscription_keys(self):
+        requests, clients = [], set()
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(201)
+
+        subscription = self.subscribe('https://push.example/send/abc')
+        with self.engine(transport=httpx.MockTransport(handler)) as engine:
+            engine.deliver([(subscription, {'title': 'Fajr'})])
+            clients.add(id(engine._client))
+            engine.deliver([(subscription, {'title': 'Dhuhr'})])
+            clients.add(id(engine._client))
+        self.assertEqual(len(clients), 1)
+
+        payloads = []
+        for request in requests:
+            record_size, payload, delimiter = decrypt_push(request.content, self.ua_private, self.auth_secret)
+            self.assertEqual((record_size, delimiter), (4096, b'\x02'))
+            self.assertEqual(request.headers['Content-Encoding'], 'aes128gcm')
+            payloads.append(json.loads(payload))
+        self.assertEqual(payloads, [{'title': 'Fajr'}, {'title': 'Dhuhr'}])
+
+        token, key = request.headers['Authorization'].removeprefix('vapid t=').split(', k=')
+        self.assertEqual(key, engine.vapid_public)
+        claims = json.loads(b64url_decode(token.split('.')[1]))
+        self.assertEqual((claims['aud'], claims['sub']), ('https://push.example', 'mailto:admin@example.com'))
+
+    def test_dead_endpoints_are_pruned_and_busy_ones_retried(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInPushHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f'http://127.0.0.1:{server.server_port}'
+
+        subscriptions = [self.subscribe(f'{base}/{path}/{uuid.uuid4().hex}') for path in ('ok', 'gone', 'missing', 'busy')]
+        with self.engine() as engine:
+            results = engine.deliver([(subscription, {'title': 'Asr'}) for subscription in subscriptions])
+
+        self.assertEqual([(result.status, result.attempts) for result in results], [(201, 1), (410, 1), (404, 1), (201, 2)])
+        self.assertEqual(
+            set(PushSubscription.objects.values_list('pk', flat=True)), {subscriptions[0].pk, subscriptions[3].pk},
+        )
+
+
+class IngestProgressTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.days = [noon - timedelta(days=n) for n in (3, 2, 1)]
+        self.sessions = [uuid.uuid4() for _ in self.days]
+        # Ten distinct pages over three consecutive days, with page 2 sent twice
+        self.entries = [
+            dict(session_id=session, page_number=page, surah_number=1, reading_time_seconds=30, completed_at=completed_at)
+            for session, completed_at, pages in zip(self.sessions, self.days, ([1, 2, 2, 3, 4], [5, 6, 7], [8, 9, 10]))
+            for page in pages
+        ]
+
+    def stats(self):
+        stat = UserReadingStat.objects.get(user=self.user)
+        return (stat.total_pages_read, stat.current_streak, stat.longest_streak,
+                stat.total_reading_time_seconds, stat.last_reading_date)
+
+    def reading_days(self):
+        return dict(QuranReadingDay.objects.filter(user=self.user).values_list('day', 'pages_read'))
+
+    def test_batch_and_resend_are_deduplicated(self):
+        self.assertEqual(ingest_progress(self.user.pk, self.entries), 10)
+        self.assertEqual(ingest_progress(self.user.pk, self.entries), 0)
+        self.assertEqual(QuranProgress.objects.filter(user=self.user).count(), 10)
+        self.assertEqual(self.stats(), (10, 3, 3, 300, self.days[-1].date()))
+        self.assertEqual(self.reading_days(), {self.days[0].date(): 4, self.days[1].date(): 3, self.days[2].date(): 3})
+
+    def test_already_stored_pages_are_counted_once(self):
+        QuranProgress.objects.create(
+            user=self.user, session_id=self.sessions[0], page_number=1, surah_number=1,
+            reading_time_seconds=30, completed_at=self.days[0],
+        )
+        self.assertEqual(ingest_progress(self.user.pk, self.entries), 9)
+        self.assertEqual(self.stats(), (10, 3, 3, 300, self.days[-1].date()))
+        self.assertEqual(self.reading_days()[self.days[0].date()], 4)
+
+    def test_rebuild_agrees_with_incremental_stats(self):
+        ingest_progress(self.user.pk, self.entries[5:])
+        ingest_progress(self.user.pk, self.entries[:5])
+        incremental = self.reading_days()
+        rebuild_reading_stats()
+        self.assertEqual(self.stats(), (10, 3, 3, 300, self.days[-1].date()))
+        self.assertEqual(self.reading_days(), incremental)
+
+
+class PrayerPeriodTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        PrayerReward.objects.bulk_create([PrayerReward(name='Fajr', reward=2)] + [
+            PrayerReward(name=name, reward=1) for name in ('Dhuhr', 'Asr', 'Maghrib', 'Isha')
+        ])
+        invalidate_rewards()
+        self.addCleanup(invalidate_rewards)
+        # A Monday-start week that straddles a month boundary
+        self.days = [date(2026, 3, 30), date(2026, 3, 31), date(2026, 4, 1)]
+        for prayer in ('fajr', 'dhuhr', 'asr', 'maghrib', 'isha'):
+            log_prayer(self.user.pk, self.days[0], prayer)
+        log_prayer(self.user.pk, self.days[1], 'fajr')
+        log_prayer(self.user.pk, self.days[1], 'dhuhr')
+        log_prayer(self.user.pk, self.days[2], 'fajr')
+        log_prayer(self.user.pk, self.days[2], 'fajr')
+
+    def periods(self):
+        return {
+            (period, start): (prayers, full_days, points)
+            for period, start, prayers, full_days, points in UserPrayerPeriodSummary.objects.filter(user=self.user)
+            .values_list('period', 'period_start', 'prayers_completed', 'full_days', 'total_points')
+        }
+
+    expected = {
+        ('week', date(2026, 3, 30)): (8, 1, 11),
+        ('month', date(2026, 3, 1)): (7, 1, 9),
+        ('month', date(2026, 4, 1)): (1, 0, 2),
+    }
+
+    def test_logging_maintains_week_and_month_totals(self):
+        self.assertEqual(self.periods(), self.expected)
+
+    def test_rebuild_matches_incremental_totals(self):
+        UserPrayerPeriodSummary.objects.filter(user=self.user).update(prayers_completed=0)
+        self.assertEqual(rebuild_prayer_periods(), 3)
+        self.assertEqual(self.periods(), self.expected)
+
+    def test_history_reads_the_aggregates(self):
+        body = api_client(self.user).get(
+            '/public/prayers/history/', {'group': 'month', 'start': '2026-03-15', 'end': '2026-04-30'},
+        ).json()
+        self.assertEqual(body['period_starts'], ['2026-03-01', '2026-04-01'])
+        self.assertEqual((body['prayers_completed'], body['full_days'], body['points']), ([7, 1], [1, 0], [9, 2]))
+
+        body = api_client(self.user).get('/public/prayers/history/', {'start': '2026-03-30', 'end': '2026-04-01'}).json()
+        self.assertEqual(body['masks'], [0b11111, 0b00011, 0b00001])
+
+
+class GroupLeaderboardTests(TestCase):
+    def test_ties_share_a_rank_and_the_other_metric_breaks_them(self):
+        board = GroupLeaderboard('group', [('a', 5, 10), ('b', 7, 3), ('c', 5, 10), ('d', 5, 20), ('e', None, None)])
+        self.assertEqual([(rank, user_id) for rank, user_id, _, _ in board.top(5)],
+                         [(1, 'b'), (2, 'd'), (3, 'a'), (3, 'c'), (5, 'e')])
+        self.assertEqual([board.rank(user_id) for user_id in 'abcde'], [3, 1, 3, 2, 5])
+        self.assertEqual([user_id for _, user_id, _, _ in board.top(3, by='pages')], ['d', 'a', 'c'])
+        self.assertEqual(board.rank('b', by='pages'), 4)
+        self.assertEqual(board.top(2)[-1], (2, 'd', 5, 20))
+        self.assertIsNone(board.rank('z'))
+
+    def test_updates_and_removals_move_members(self):
+        board = GroupLeaderboard('group', [('a', 1, 1), ('b', 2, 2), ('c', 3, 3)])
+        board.update('a', 4, 1)
+        self.assertEqual(board.rank('a'), 1)
+        board.remove('c')
+        board.remove('c')
+        self.assertEqual([user_id for _, user_id, _, _ in board.top(10)], ['a', 'b'])
+        self.assertEqual((board.member_count, board.average_streak), (2, 3))
+
+
+class LeaderboardIndexTests(TestCase):
+    def setUp(self):
+        self.group_id = uuid.uuid4()
+        self.users = [make_user() for _ in range(3)]
+        for user, (streak, pages) in zip(self.users, [(2, 40), (6, 10), (2, 50)]):
+            ChallengeGroupMember.objects.create(group_id=self.group_id, user=user)
+            UserReadingStat.objects.create(user=user, current_streak=streak, total_pages_read=pages)
+        self.index = LeaderboardIndex()
+
+    def test_board_is_loaded_once_and_refreshed_per_user(self):
+        board = self.index.ranking(self.group_id, self.users[0].pk)
+        self.assertEqual([user_id for _, user_id, _, _ in board['top']], [self.users[i].pk for i in (1, 2, 0)])
+        self.assertEqual((board['rank'], board['stats'], board['member_count']), (3, (2, 40), 3))
+
+        UserReadingStat.objects.filter(user=self.users[0]).update(current_streak=9)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.ranking(self.group_id, self.users[0].pk)['rank'], 3)
+        self.index.refresh_user(self.users[0].pk)
+        self.assertEqual(self.index.ranking(self.group_id, self.users[0].pk)['rank'], 1)
+
+    def test_view_ranks_members_and_refuses_outsiders(self):
+        body = api_client(self.users[2]).get(f'/public/groups/{self.group_id}/leaderboard/', {'by': 'pages'}).json()
+        self.assertEqual([row['total_pages_read'] for row in body['top']], [50, 40, 10])
+        self.assertEqual(body['me'], {'rank': 1, 'current_streak': 2, 'total_pages_read': 50})
+        self.assertEqual(api_client(make_user()).get(f'/public/groups/{self.group_id}/leaderboard/').status_code, 403)
+
+
+class JoinRequestReviewTests(TestCase):
+    def setUp(self):
+        self.owner, self.other_owner = make_user(), make_user()
+        self.group, self.other_group = (make_group(owner) for owner in (self.owner, self.other_owner))
+        self.requesters = [make_user() for _ in range(3)]
+        # Already a member, e.g. added by hand before the request was reviewed
+        ChallengeGroupMember.objects.create(group_id=self.group.pk, user=self.requesters[0])
+        self.requests = [self.request_to_join(self.group, user) for user in self.requesters]
+        self.other_request = self.request_to_join(self.other_group, self.requesters[0])
+
+    def request_to_join(self, group, user):
+        return GroupJoinRequest.objects.create(group_id=group, user_id=user, invite_code=group.invite_code)
+
+    def review(self, reviewer, requests, action):
+        return api_client(reviewer).post('/public/groups/join_requests/review/', {
+            'ids': [str(request.pk) for request in requests], 'action': action,
+        }, format='json').json()
+
+    def test_approval_adds_members_and_skips_other_groups(self):
+        self.assertEqual(group_by_invite_code(self.group.invite_code)['member_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            body = self.review(self.owner, self.requests + [self.other_request], 'approve')
+        self.assertCountEqual(body['reviewed'], [str(request.pk) for request in self.requests])
+        self.assertEqual(body['skipped'], [str(self.other_request.pk)])
+
+        members = ChallengeGroupMember.objects.filter(group_id=self.group.pk)
+        self.assertEqual(set(members.values_list('user_id', flat=True)), {user.pk for user in self.requesters})
+        self.assertEqual(members.filter(daily_target_pages=4).count(), 2)
+        self.assertEqual(GroupChatParticipant.objects.filter(group_id=self.group).count(), 3)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 3)
+        self.assertEqual(group_by_invite_code(self.group.invite_code)['member_count'], 3)
+        self.assertFalse(ChallengeGroupMember.objects.filter(group_id=self.other_group.pk).exists())
+
+        self.assertEqual(review_join_requests(self.owner.pk, [self.requests[1].pk], approve=False)['skipped'],
+                         [self.requests[1].pk])
+
+    def test_regenerated_invite_code_stops_resolving(self):
+        client = api_client(self.owner)
+        old_code = self.group.invite_code
+        self.assertEqual(client.get(f'/public/groups/invite/{old_code}/').status_code, 200)
+
+        self.group.invite_code = uuid.uuid4().hex[:15]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.save()
+        self.assertEqual(client.get(f'/public/groups/invite/{old_code}/').status_code, 404)
+        self.assertEqual(client.get(f'/public/groups/invite/{self.group.invite_code}/').json()['id'], str(self.group.pk))
+
+    def test_group_admin_can_reject(self):
+        ChallengeGroupMember.objects.create(group_id=self.other_group.pk, user=self.owner, is_admin=True)
+        body = self.review(self.owner, [self.other_request], 'reject')
+        self.assertEqual(body['reviewed'], [str(self.other_request.pk)])
+        self.other_request.refresh_from_db()
+        self.assertEqual((self.other_request.status, self.other_request.reviewed_by_id), ('rejected', self.owner.pk))
+        self.assertEqual(ChallengeGroupMember.objects.filter(group_id=self.other_group.pk).count(), 1)
+
+
+class QuranMetadataTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        CachedChapters.objects.create(
+            id=1, revelation_place='makkah', revelation_order=5, name_simple='Al-Fatihah', name_complex='Al-Fātiĥah',
+            name_arabic='الفاتحة', verses_count=7, pages='[1, 1]', translated_name='{"name": "The Opener"}',
+            created_at=now, updated_at=now,
+        )
+        self.metadata = CacheMetadata.objects.create(cache_type='chapters', last_updated=now, created_at=now)
+        quran_metadata.invalidate()
+        self.addCleanup(quran_metadata.invalidate)
+
+    def test_etag_revalidation(self):
+        client = APIClient()
+        response = client.get('/public/quran/chapters/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['pages'], [1, 1])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = client.get('/public/quran/chapters/', HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual((response.status_code, response.content, response['ETag']), (304, b'', etag))
+
+        CachedChapters.objects.filter(pk=1).update(name_simple='Al-Faatiha')
+        CacheMetadata.objects.filter(pk=self.metadata.pk).update(last_updated=timezone.now())
+        quran_metadata.invalidate('chapters')
+        response = client.get('/public/quran/chapters/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_snapshot_is_rebuilt_only_when_last_updated_moves(self):
+        metadata = QuranMetadataCache(check_interval=0)
+        snapshot = metadata.get('chapters')
+        CachedChapters.objects.filter(pk=1).update(name_simple='Al-Faatiha')
+        self.assertIs(metadata.get('chapters'), snapshot)
+
+        CacheMetadata.objects.filter(pk=self.metadata.pk).update(last_updated=timezone.now() + timedelta(seconds=1))
+        self.assertIn(b'Al-Faatiha', metadata.get('chapters').body)
+        self.assertEqual(QuranMetadataCache().get('chapters').etag, metadata.get('chapters').etag)
+
+
+VERSES_PER_SURAH = (
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111, 110, 98, 135, 112, 78, 118, 64,
+    77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45, 83, 182, 88, 75, 85, 54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49,
+    62, 55, 78, 96, 29, 22, 24, 13, 14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21, 11, 8, 8, 19, 5, 8, 8, 11, 11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6,
+)
+SURAH_FIRST_PAGES = (
+    1, 2, 50, 77, 106, 128, 151, 177, 187, 208, 221, 235, 249, 255, 262, 267, 282, 293, 305, 312, 322, 332, 342, 350,
+    359, 367, 377, 385, 396, 404, 411, 415, 418, 428, 434, 440, 446, 453, 458, 467, 477, 483, 489, 496, 499, 502, 507,
+    511, 515, 518, 520, 523, 526, 528, 531, 534, 537, 542, 545, 549, 551, 553, 554, 556, 558, 560, 562, 564, 566, 568,
+    570, 572, 574, 575, 577, 578, 580, 582, 583, 585, 586, 587, 587, 589, 590, 591, 591, 592, 593, 594, 595, 595, 596,
+    596, 597, 597, 598, 598, 599, 599, 600, 600, 601, 601, 601, 602, 602, 602, 603, 603, 603, 604, 604, 604,
+)
+
+
+def mushaf_chapters():
+    """Chapter rows shaped like the cached API data: only first and last page per surah."""
+    last_pages = [max(first, following - 1) for first, following in zip(SURAH_FIRST_PAGES, SURAH_FIRST_PAGES[1:])]
+    return [
+        {'id': surah, 'verses_count': verses, 'pages': [first, last]}
+        for surah, (verses, first, last) in enumerate(zip(VERSES_PER_SURAH, SURAH_FIRST_PAGES, last_pages + [604]), start=1)
+    ]
+
+
+class QuranIndexTests(TestCase):
+    def setUp(self):
+        self.index = QuranIndex.from_chapters(mushaf_chapters())
+
+    def test_incomplete_chapter_lists_are_refused(self):
+        chapters = mushaf_chapters()
+        self.assertIsNone(QuranIndex.from_chapters(chapters[1:]))
+        chapters[0]['verses_count'] = 8
+        self.assertIsNone(QuranIndex.from_chapters(chapters))
+
+    def test_verse_index(self):
+        self.assertEqual(sum(VERSES_PER_SURAH), VERSE_COUNT)
+        self.assertEqual([self.index.verse_index(*verse) for verse in [(1, 1), (2, 1), (114, 6)]], [0, 7, VERSE_COUNT - 1])
+        self.assertEqual([self.index.verse_index(*verse) for verse in [(1, 8), (115, 1), (0, 1)]], [None, None, None])
+
+    def test_page_and_hizb_only_when_the_page_is_known(self):
+        self.assertEqual(self.index.locate(1, 5), {'page': 1, 'juz': 1, 'hizb': 1})
+        self.assertEqual(self.index.locate(2, 1), {'page': 2, 'juz': 1, 'hizb': 1})
+        self.assertEqual(self.index.locate(2, 286), {'page': 49, 'juz': 3, 'hizb': 5})
+        self.assertEqual(self.index.locate(2, 200), {'page': None, 'juz': 2, 'hizb': None})
+        self.assertEqual(self.index.locate(112, 1), {'page': 604, 'juz': 30, 'hizb': 60})
+        self.assertIsNone(self.index.locate(2, 287))
+
+        exact = self.index.page_exact
+        self.assertTrue(((self.index.verse_hizb[exact] + 1) // 2 == self.index.verse_juz[exact]).all())
+        self.assertFalse(self.index.verse_hizb[~exact].any())
+
+    def test_page_lookups(self):
+        self.assertEqual(self.index.page_range(2), (2, 49))
+        self.assertEqual(self.index.page_verses(1), ((1, 1), (1, 7)))
+        self.assertEqual(self.index.page_verses(604), ((112, 1), (114, 6)))
+        self.assertIsNone(self.index.page_verses(30))
+
+    def test_per_verse_pages_are_exact(self):
+        chapters = mushaf_chapters()
+        chapters[1]['pages'] = [2 + verse * 48 // 286 for verse in range(286)]
+        index = QuranIndex.from_chapters(chapters)
+        self.assertEqual(index.locate(2, 200), {'page': 35, 'juz': 2, 'hizb': 4})
+        self.assertEqual(index.page_verses(35), ((2, 198), (2, 203)))
+
+    def test_coverage(self):
+        self.assertEqual(self.index.coverage(range(1, 605)), {'pages': 100.0, 'verses': 100.0})
+        self.assertEqual(self.index.coverage([1, 1, 0, 605]), {'pages': 0.17, 'verses': 0.11})
+
+
+class VerseBookmarkPageTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        CachedChapters.objects.bulk_create([
+            CachedChapters(
+                id=chapter['id'], revelation_place='makkah', revelation_order=chapter['id'], name_simple='',
+                name_complex='', name_arabic='', verses_count=chapter['verses_count'],
+                pages=json.dumps(chapter['pages']), created_at=now, updated_at=now,
+            )
+            for chapter in mushaf_chapters()
+        ])
+        CacheMetadata.objects.create(cache_type='chapters', last_updated=now, created_at=now)
+        quran_metadata.invalidate()
+        self.addCleanup(quran_metadata.invalidate)
+
+    def validate(self, **data):
+        serializer = VerseBookmarkSerializer(data=data)
+        return serializer.validated_data if serializer.is_valid() else serializer.errors
+
+    def test_page_is_filled_only_when_known(self):
+        self.assertEqual(self.validate(surah_number=2, verse_number=1)['page_number'], 2)
+        self.assertIn('page_number', self.validate(surah_number=2, verse_number=200))
+        self.assertEqual(self.validate(surah_number=2, verse_number=200, page_number=35)['page_number'], 35)
+
+    def test_pages_and_verses_are_checked_against_the_surah(self):
+        self.assertIn('page_number', self.validate(surah_number=2, verse_number=200, page_number=60))
+        self.assertIn('verse_number', self.validate(surah_number=1, verse_number=8, page_number=1))
+
+
+class ChatHistoryStreamingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.session_id = uuid.uuid4()
+        now = timezone.now()
+        self.messages = [
+            ChatHistory.objects.create(
+                user=self.user, session_id=self.session_id, message_type='user', message_content=f'message {i}',
+                created_at=now + timedelta(seconds=i // 2),
+            )
+            for i in range(5)
+        ]
+        self.url = f'/public/chat/sessions/{self.session_id}/history/'
+
+    def expected_ids(self):
+        return [str(message.pk) for message in sorted(self.messages, key=lambda message: (message.created_at, message.pk))]
+
+    def test_wsgi_streams_a_json_array(self):
+        response = api_client(self.user).get(self.url)
+        self.assertFalse(response.is_async)
+        self.assertEqual([row['id'] for row in json.loads(b''.join(response.streaming_content))], self.expected_ids())
+
+    async def test_asgi_streams_asynchronously(self):
+        response = await self.async_client.get(self.url, AUTHORIZATION=await sync_to_async(bearer)(self.user))
+        self.assertTrue(response.is_async)
+        body = b''.join([part async for part in response.streaming_content])
+        self.assertEqual([row['id'] for row in json.loads(body)], self.expected_ids())
+
+    async def test_asgi_export_is_ndjson(self):
+        response = await self.async_client.get('/public/chat/export/', AUTHORIZATION=await sync_to_async(bearer)(self.user))
+        lines = b''.join([part async for part in response.streaming_content]).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], self.expected_ids())
+
+    def test_rows_are_read_one_keyset_chunk_per_query(self):
+        async def read_chunks():
+            return [chunk async for chunk in aiter_chunks(queryset, ['message_content'], chunk_size=2)]
+
+        queryset = ChatHistory.objects.filter(session_id=self.session_id).order_by('created_at', 'id')
+        with self.assertNumQueries(3):
+            chunks = async_to_sync(read_chunks)()
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            [row['message_content'] for chunk in chunks for row in chunk],
+            [ChatHistory.objects.get(pk=pk).message_content for pk in self.expected_ids()],
+        )
+
+
+def upstream_chapter(chapter_id, name):
+    return {
+        'id': chapter_id, 'revelation_place': 'makkah', 'revelation_order': chapter_id, 'bismillah_pre': True,
+        'name_simple': name, 'name_complex': name, 'name_arabic': name, 'verses_count': 7,
+        'pages': [chapter_id, chapter_id], 'translated_name': {'language_name': 'english', 'name': name},
+    }
+
+
+class QuranRefreshTests(TestCase):
+    def refresh(self, chapters, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+            json.dump({'chapters': chapters, 'reciters': [{'id': 1, 'name': 'Reciter', 'style': None}]}, f)
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command('refresh_quran_metadata', '--file', f.name, *args, stdout=out)
+        return out.getvalue()
+
+    def metadata(self):
+        return CacheMetadata.objects.values_list('total_records', 'last_updated').get(cache_type='chapters')
+
+    def test_counts_and_metadata_follow_the_content_hashes(self):
+        chapters = [upstream_chapter(i, f'Chapter {i}') for i in (1, 2, 3)]
+        output = self.refresh(chapters)
+        self.assertIn('chapters: 3 created, 0 updated, 0 unchanged, 0 deleted', output)
+        self.assertIn('reciters: 1 created, 0 updated, 0 unchanged, 0 deleted', output)
+        total, first_update = self.metadata()
+        self.assertEqual(total, 3)
+        self.assertEqual(CachedChapters.objects.get(pk=2).translated_name, '{"language_name":"english","name":"Chapter 2"}')
+
+        # Same content, keys in another order and JSON columns given as text
+        reordered = [dict(reversed(list(chapter.items()))) for chapter in chapters]
+        reordered[0]['translated_name'] = json.dumps(reordered[0]['translated_name'])
+        with CaptureQueriesContext(connection) as queries:
+            output = self.refresh(reordered)
+        self.assertIn('chapters: 0 created, 0 updated, 3 unchanged, 0 deleted', output)
+        self.assertIn('reciters: 0 created, 0 updated, 1 unchanged, 0 deleted', output)
+        writes = [q['sql'] for q in queries if q['sql'].split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+        self.assertEqual(self.metadata(), (3, first_update))
+
+        changed = [upstream_chapter(1, 'Al-Fatihah'), chapters[1], upstream_chapter(4, 'Chapter 4')]
+        self.assertIn('chapters: 1 created, 1 updated, 1 unchanged, 0 deleted', self.refresh(changed))
+        total, last_updated = self.metadata()
+        self.assertEqual(total, 4)
+        self.assertGreater(last_updated, first_update)
+        self.assertEqual(CachedChapters.objects.get(pk=1).name_simple, 'Al-Fatihah')
+
+        self.assertIn('chapters: 0 created, 0 updated, 3 unchanged, 1 deleted', self.refresh(changed, '--prune'))
+        self.assertEqual(self.metadata()[0], 3)
+        self.assertEqual(sorted(CachedChapters.objects.values_list('pk', flat=True)), [1, 2, 4])
+        self.assertEqual(CachedReciter.objects.count(), 1)
+
+
+class GroupChatBatchingTests(TransactionTestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.group = make_group(self.user)
+        GroupChatParticipant.objects.create(group_id=self.group, user_id=self.user.pk)
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.batcher = MessageBatcher(max_batch=3, max_delay=60)
+        patcher = mock.patch('public.consumers.message_batcher', self.batcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f'/ws/groups/{self.group.pk}/chat/?token={self.token}',
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def send(self, communicator, *texts):
+        for text in texts:
+            await communicator.send_json_to({'message': text})
+            self.assertEqual((await communicator.receive_json_from())['message']['message_content'], text)
+
+    async def finish(self, communicator):
+        await communicator.disconnect()
+        if self.batcher._timer is not None:
+            self.batcher._timer.cancel()
+
+    @sync_to_async
+    def stored(self):
+        return sorted(GroupChatMessage.objects.filter(group_id=self.group).values_list('message_content', flat=True))
+
+    async def test_messages_are_written_in_batches(self):
+        communicator = await self.connect()
+        with mock.patch.object(GroupChatMessage.objects, 'bulk_create', wraps=GroupChatMessage.objects.bulk_create) as bulk:
+            await self.send(communicator, 'one', 'two')
+            self.assertEqual(await self.stored(), [])
+            await self.send(communicator, 'three', 'four')
+            self.assertEqual(await self.stored(), ['one', 'three', 'two'])
+            await self.batcher.flush()
+        self.assertEqual([len(call.args[0]) for call in bulk.call_args_list], [3, 1])
+        self.assertEqual(await self.stored(), ['four', 'one', 'three', 'two'])
+        await self.finish(communicator)
+
+    async def test_failed_flush_keeps_the_buffered_messages(self):
+        communicator = await self.connect()
+        with mock.patch.object(GroupChatMessage.objects, 'bulk_create', side_effect=OperationalError('gone')), \
+                mock.patch.object(GroupChatMessage, 'save', side_effect=OperationalError('gone')), \
+                self.assertLogs('public.chat'):
+            await self.send(communicator, 'one', 'two', 'three')
+        self.assertEqual(await self.stored(), [])
+        self.assertEqual(len(self.batcher._pending), 3)
+
+        # The bulk insert still fails, so the retry stores the messages one by one
+        with mock.patch.object(GroupChatMessage.objects, 'bulk_create', side_effect=OperationalError('gone')), \
+                self.assertLogs('public.chat'):
+            await self.batcher.flush()
+        self.assertEqual(await self.stored(), ['one', 'three', 'two'])
+        self.assertEqual((self.batcher._pending, self.batcher._attempts), ([], {}))
+        await self.finish(communicator)
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = api_client(self.user)
+        self.notifications = [
+            Notification.objects.create(user_id=self.user, notification_type='prayer_fajr', title='Fajr', message='')
+            for _ in range(3)
+        ]
+
+    def unread_count(self):
+        return self.client.get('/public/notifications/unread_count/').json()['unread_count']
+
+    def mark_read(self, *notifications):
+        ids = [str(notification.pk) for notification in notifications]
+        return self.client.post('/public/notifications/read/', {'ids': ids}, format='json').json()['marked_read']
+
+    def test_hit_runs_no_queries(self):
+        self.assertEqual(self.unread_count(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 3)
+
+    def test_mark_read_and_mark_all_read_update_the_badge(self):
+        self.assertEqual(self.unread_count(), 3)
+        self.assertEqual(self.mark_read(self.notifications[0]), 1)
+        self.assertEqual(self.mark_read(self.notifications[0]), 0)
+        self.assertEqual(self.unread_count(), 2)
+
+        self.assertEqual(self.client.post('/public/notifications/read_all/').json()['marked_read'], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 0)
+
+    def test_process_local_counter_is_dropped_not_incremented(self):
+        cache = caches['default']
+        self.assertEqual(self.unread_count(), 3)
+        adjust_unread_count(self.user.pk, 1)
+        self.assertIsNone(cache.get(_unread_key(self.user.pk)))
+        self.assertEqual(self.unread_count(), 3)
+
+    def test_shared_counter_is_adjusted_in_place(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'counters': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+            },
+            NOTIFICATION_COUNTER_CACHE='counters',
+        ):
+            adjust_unread_count(self.user.pk, 1)
+            self.assertIsNone(caches['counters'].get(_unread_key(self.user.pk)))
+            self.assertEqual(self.unread_count(), 3)
+            self.assertEqual(self.mark_read(*self.notifications[:2]), 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.unread_count(), 1)
+
+
+class QuranCoverageTests(TestCase):
+    def read(self, *pages):
+        read = np.zeros(604, dtype=bool)
+        read[[page - 1 for page in pages]] = True
+        return read
+
+    def test_unread_ranges_at_the_boundaries(self):
+        self.assertEqual(unread_ranges(self.read()), [[1, 604]])
+        self.assertEqual(unread_ranges(self.read(*range(1, 605))), [])
+        self.assertEqual(unread_ranges(self.read(1, 604)), [[2, 603]])
+        self.assertEqual(unread_ranges(self.read(*range(2, 604))), [[1, 1], [604, 604]])
+        self.assertEqual(unread_ranges(self.read(*range(1, 5), *range(8, 10), 11, *range(13, 605))),
+                         [[5, 7], [10, 10], [12, 12]])
+
+    def test_summary(self):
+        counts = np.zeros(604, dtype=np.uint16)
+        counts[:20] = 2
+        counts[20] = 1
+        summary = summarize(counts)
+        self.assertEqual((summary['pages_read'], summary['khatm_count'], summary['gaps'], summary['next_unread_page']),
+                         (21, 0, [[22, 604]], 22))
+        self.assertEqual(summary['juz_completion'][:2], [100.0, 0.0])
+        self.assertEqual(np.unpackbits(np.frombuffer(base64.b64decode(summary['bitset']), dtype=np.uint8))[:22].tolist(),
+                         [1] * 21 + [0])
+
+        counts[:] = 1
+        counts[0] = 2
+        summary = summarize(counts)
+        self.assertEqual((summary['khatm_count'], summary['current_khatm_percent'], summary['gap_count']), (1, 0.17, 0))
+        self.assertIsNone(summary['next_unread_page'])
+
+    def test_cached_counts_are_dropped_when_an_ingest_commits(self):
+        user = make_user()
+        self.assertEqual(int(get_page_counts(user.pk).sum()), 0)
+        entries = [
+            dict(session_id=uuid.uuid4(), page_number=page, surah_number=1, reading_time_seconds=10)
+            for page in (1, 2, 2)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ingest_progress(user.pk, entries), 3)
+            self.assertEqual(int(get_page_counts(user.pk).sum()), 0)
+        self.assertEqual(get_page_counts(user.pk)[:3].tolist(), [1, 2, 0])
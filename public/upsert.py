@@ -0,0 +1,98 @@
+from django.db import IntegrityError, connections, router, transaction
+
+
+def _column_converters(field, connection, table):
+    col = field.get_col(table)
+    return col, connection.ops.get_db_converters(col) + col.get_db_converters(connection)
+
+
+def _row_to_instance(model, connection, db, fields, row):
+    table = model._meta.db_table
+    values = []
+    for field, value in zip(fields, row):
+        col, converters = _column_converters(field, connection, table)
+        for converter in converters:
+            value = converter(value, col, connection)
+        values.append(value)
+    return model.from_db(db, [f.attname for f in fields], values)
+
+
+def _on_conflict_sql(qn, table, columns, conflict_columns, update_columns):
+    updates = ', '.join(f'{qn(c)} = EXCLUDED.{qn(c)}' for c in update_columns)
+    return (
+        f'INSERT INTO {qn(table)} ({", ".join(qn(c) for c in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({", ".join(qn(c) for c in conflict_columns)}) DO UPDATE SET {updates} '
+        f'RETURNING {", ".join(qn(c) for c in columns)}'
+    )
+
+
+def _merge_sql(qn, table, columns, conflict_columns, update_columns):
+    # HOLDLOCK keeps two concurrent MERGEs for the same key from both taking the INSERT branch.
+    source = ', '.join(f'%s AS {qn(c)}' for c in columns)
+    match = ' AND '.join(f'target.{qn(c)} = source.{qn(c)}' for c in conflict_columns)
+    updates = ', '.join(f'target.{qn(c)} = source.{qn(c)}' for c in update_columns)
+    return (
+        f'MERGE {qn(table)} WITH (HOLDLOCK) AS target '
+        f'USING (SELECT {source}) AS source ON {match} '
+        f'WHEN MATCHED THEN UPDATE SET {updates} '
+        f'WHEN NOT MATCHED THEN INSERT ({", ".join(qn(c) for c in columns)}) '
+        f'VALUES ({", ".join("source." + qn(c) for c in columns)}) '
+        f'OUTPUT {", ".join("inserted." + qn(c) for c in columns)};'
+    )
+
+
+def upsert(model, conflict_fields, values, update_fields, using=None):
+    """
+    Insert ``values`` or, when a row with the same ``conflict_fields`` exists,
+    overwrite only ``update_fields`` on it. Runs as one statement and returns
+    the resulting row as a model instance.
+
+    ``values`` must hold every column needed for the INSERT branch (callers
+    fill unspecified fields with their defaults).
+    """
+    db = using or router.db_for_write(model)
+    connection = connections[db]
+    opts = model._meta
+
+    fields = [f for f in opts.concrete_fields if f.attname in values]
+    columns = [f.column for f in fields]
+    conflict_columns = [opts.get_field(name).column for name in conflict_fields]
+    update_columns = [opts.get_field(name).column for name in update_fields]
+    params = [f.get_db_prep_save(values[f.attname], connection) for f in fields]
+
+    if connection.vendor in ('sqlite', 'postgresql'):
+        sql = _on_conflict_sql(connection.ops.quote_name, opts.db_table, columns, conflict_columns, update_columns)
+    elif connection.vendor == 'microsoft':
+        sql = _merge_sql(connection.ops.quote_name, opts.db_table, columns, conflict_columns, update_columns)
+    else:
+        lookup = {name: values[opts.get_field(name).attname] for name in conflict_fields}
+        defaults = {opts.get_field(name).attname: values[opts.get_field(name).attname] for name in update_fields}
+        create_defaults = {k: v for k, v in values.items() if k not in lookup}
+        instance, created = model._default_manager.using(db).get_or_create(defaults=create_defaults, **lookup)
+        if not created:
+            for attname, value in defaults.items():
+                setattr(instance, attname, value)
+            instance.save(using=db, update_fields=list(defaults))
+        return instance
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return _row_to_instance(model, connection, db, fields, row)
+
+
+def update_or_insert(model, lookup, changes, defaults):
+    """
+    UPDATE the row matching ``lookup`` with ``changes`` (typically F()
+    increments); INSERT ``lookup`` + ``defaults`` when no row matched. A
+    concurrent insert of the same row is absorbed by re-running the UPDATE.
+    """
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        # Another request created the row first; apply on top of it
+        model.objects.filter(**lookup).update(**changes)
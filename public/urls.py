@@ -1,6 +1,34 @@
 from django.urls import path
-from .views import UserPreferenceView
+from .views import (
+    UserPreferenceView, CommunityFeedView, PalInboxView, PalMessageHistoryView, PalMarkReadView,
+    ChatSessionHistoryView, ChatHistoryExportView, NotificationListView, NotificationUnreadCountView,
+    NotificationMarkReadView, NotificationMarkAllReadView, QuranProgressSyncView,
+    QuranReadingDaysView, PrayerLogView, PrayerHistoryView,
+    GroupLeaderboardView, GroupInviteLookupView, GroupJoinRequestReviewView,
+    QuranMetadataView, VerseBookmarkView, QuranCoverageView,
+)
 
 urlpatterns = [
     path('user_preferences/', UserPreferenceView.as_view(), name='user_preferences'),
+    path('community/feed/', CommunityFeedView.as_view(), name='community_feed'),
+    path('pal/inbox/', PalInboxView.as_view(), name='pal_inbox'),
+    path('pal/connections/<uuid:connection_id>/messages/', PalMessageHistoryView.as_view(), name='pal_messages'),
+    path('pal/connections/<uuid:connection_id>/read/', PalMarkReadView.as_view(), name='pal_mark_read'),
+    path('chat/sessions/<uuid:session_id>/history/', ChatSessionHistoryView.as_view(), name='chat_session_history'),
+    path('chat/export/', ChatHistoryExportView.as_view(), name='chat_history_export'),
+    path('notifications/', NotificationListView.as_view(), name='notifications'),
+    path('notifications/unread_count/', NotificationUnreadCountView.as_view(), name='notifications_unread_count'),
+    path('notifications/read/', NotificationMarkReadView.as_view(), name='notifications_mark_read'),
+    path('notifications/read_all/', NotificationMarkAllReadView.as_view(), name='notifications_mark_all_read'),
+    path('quran/progress/sync/', QuranProgressSyncView.as_view(), name='quran_progress_sync'),
+    path('quran/progress/daily/', QuranReadingDaysView.as_view(), name='quran_reading_days'),
+    path('quran/progress/coverage/', QuranCoverageView.as_view(), name='quran_coverage'),
+    path('prayers/log/', PrayerLogView.as_view(), name='prayer_log'),
+    path('prayers/history/', PrayerHistoryView.as_view(), name='prayer_history'),
+    path('groups/<uuid:group_id>/leaderboard/', GroupLeaderboardView.as_view(), name='group_leaderboard'),
+    path('groups/invite/<str:invite_code>/', GroupInviteLookupView.as_view(), name='group_invite_lookup'),
+    path('groups/join_requests/review/', GroupJoinRequestReviewView.as_view(), name='group_join_requests_review'),
+    path('quran/chapters/', QuranMetadataView.as_view(cache_type='chapters'), name='quran_chapters'),
+    path('quran/reciters/', QuranMetadataView.as_view(cache_type='reciters'), name='quran_reciters'),
+    path('quran/bookmarks/', VerseBookmarkView.as_view(), name='verse_bookmarks'),
 ]
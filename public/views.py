@@ -1,32 +1,444 @@
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.db.models import Case, F, IntegerField, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
-from .models import UserPreference
-from .serializers import UserPreferenceSerializer
+from rest_framework.exceptions import PermissionDenied
+from .models import (
+    UserPreference, CommunityPost, PalMessage, PrayerPalConnection, ChatHistory, Notification, QuranReadingDay,
+    UserPrayerSummary, UserPrayerPeriodSummary, UserProfile, VerseBookmark,
+)
+from .serializers import (
+    UserPreferenceSerializer, cached_user_preference, CommunityFeedPostSerializer, PalMessageSerializer,
+    PrayerPalConnectionSerializer, PalMarkReadSerializer, NotificationSerializer,
+    NotificationMarkReadSerializer, QuranProgressSyncSerializer, QuranReadingDaySerializer,
+    DateRangeSerializer, PrayerLogSerializer, UserPrayerSummarySerializer, PrayerHistorySerializer,
+    LeaderboardQuerySerializer, JoinRequestReviewSerializer, VerseBookmarkSerializer,
+)
+from .notifications import get_unread_count, adjust_unread_count, reset_unread_count
+from .pagination import KeysetPagination
+from .streaming import stream_queryset
+from .cache import preference_cache, etag_matches
+from .reading_stats import ingest_progress, user_zone
+from .prayer_log import log_prayer, period_starts, prayer_mask
+from .prayer_times import PRAYERS
+from .leaderboards import leaderboard_index
+from .groups import group_by_invite_code, review_join_requests
+from .quran_metadata import quran_metadata
+from .quran_index import get_quran_index
+from .quran_coverage import get_page_counts, summarize
+
 
 class UserPreferenceView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        try:
-            preference = UserPreference.objects.get(user=request.user)
-            serializer = UserPreferenceSerializer(preference)
-            return Response(serializer.data)
-        
-        except UserPreference.DoesNotExist:
-            return Response(None, status=status.HTTP_200_OK)
+        cached = cached_user_preference(request.user.pk)
+        headers = {'ETag': cached['etag'], 'Cache-Control': 'private, no-cache'}
 
-    def post(self, request):
-        try:
-            preference = UserPreference.objects.get(user=request.user)
-            serializer = UserPreferenceSerializer(preference, data=request.data, partial=True)
+        if etag_matches(request, cached['etag']):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(cached['data'], status=status.HTTP_200_OK, headers=headers)
 
-        except UserPreference.DoesNotExist:
-            serializer = UserPreferenceSerializer(data=request.data)
+    def post(self, request):
+        serializer = UserPreferenceSerializer(data=request.data, partial=True)
 
         if serializer.is_valid():
-            serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            preference = UserPreference.objects.upsert(request.user, **serializer.validated_data)
+            preference_cache.delete(request.user.pk)
+            return Response(UserPreferenceSerializer(preference).data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CommunityFeedPagination(KeysetPagination):
+    # Matches idx_community_posts_pinned (is_pinned, created_at); id breaks ties
+    ordering = ('-is_pinned', '-created_at', '-id')
+
+
+class CommunityFeedView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = CommunityFeedPostSerializer
+    pagination_class = CommunityFeedPagination
+
+    def get_queryset(self):
+        # Counts are denormalized columns on CommunityPost, no aggregation needed
+        return CommunityPost.objects.select_related('category_id', 'community_profile_id')
+
+
+def user_connections(user_id):
+    return PrayerPalConnection.objects.filter(Q(requester_id=user_id) | Q(receiver_id=user_id))
+
+
+def latest_messages_with_unread(user_id, connection_ids):
+    """
+    One row per connection: its newest message, annotated with how many
+    messages in that connection are still unread by ``user_id``. Both come
+    from window functions over a single scan of idx_pal_messages_connection_id.
+    """
+    unread = Case(When(receiver_id=user_id, read_at__isnull=True, then=Value(1)), default=Value(0), output_field=IntegerField())
+    return (
+        PalMessage.objects
+        .filter(connection_id__in=connection_ids)
+        .annotate(
+            position=Window(RowNumber(), partition_by=[F('connection_id')], order_by=[F('created_at').desc(), F('id').desc()]),
+            unread_count=Window(Sum(unread), partition_by=[F('connection_id')]),
+        )
+        .filter(position=1)
+    )
+
+
+class PalInboxView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        connections = list(user_connections(request.user.pk))
+        latest = {
+            message.connection_id: message
+            for message in latest_messages_with_unread(request.user.pk, [c.id for c in connections])
+        }
+
+        entries = []
+        for connection in connections:
+            message = latest.get(connection.id)
+            entries.append({
+                'connection': PrayerPalConnectionSerializer(connection).data,
+                'latest_message': PalMessageSerializer(message).data if message else None,
+                'unread_count': message.unread_count if message else 0,
+                'last_activity': message.created_at if message else connection.updated_at,
+            })
+        entries.sort(key=lambda entry: entry['last_activity'], reverse=True)
+        return Response(entries, status=status.HTTP_200_OK)
+
+
+class PalMessagePagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class PalMessageHistoryView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = PalMessageSerializer
+    pagination_class = PalMessagePagination
+
+    def get_queryset(self):
+        connection = get_object_or_404(user_connections(self.request.user.pk), pk=self.kwargs['connection_id'])
+        return PalMessage.objects.filter(connection_id=connection.id)
+
+
+class PalMarkReadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, connection_id):
+        get_object_or_404(user_connections(request.user.pk), pk=connection_id)
+        serializer = PalMarkReadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Resolve the boundary message inline so the whole mark-read is one UPDATE
+        boundary = PalMessage.objects.filter(pk=serializer.validated_data['up_to'], connection_id=connection_id)
+        boundary_created_at = Subquery(boundary.values('created_at')[:1])
+        updated = PalMessage.objects.filter(
+            Q(created_at__lt=boundary_created_at) |
+            Q(created_at=boundary_created_at, id__lte=serializer.validated_data['up_to']),
+            connection_id=connection_id,
+            receiver_id=request.user.pk,
+            read_at__isnull=True,
+        ).update(read_at=timezone.now())
+        return Response({'marked_read': updated}, status=status.HTTP_200_OK)
+
+
+CHAT_HISTORY_FIELDS = ('id', 'session_id', 'message_type', 'message_content', 'emotion_context', 'interaction_type', 'created_at')
+
+
+class ChatSessionHistoryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
+        messages = ChatHistory.objects.filter(user_id=request.user.pk, session_id=session_id).order_by('created_at', 'id')
+        return stream_queryset(request, messages, CHAT_HISTORY_FIELDS)
+
+
+class ChatHistoryExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        messages = ChatHistory.objects.filter(user_id=request.user.pk).order_by('session_id', 'created_at', 'id')
+        response = stream_queryset(request, messages, CHAT_HISTORY_FIELDS, ndjson=True)
+        response['Content-Disposition'] = 'attachment; filename="chat_history.ndjson"'
+        return response
+
+
+class NotificationPagination(KeysetPagination):
+    # Served by idx_noti_usr_id_ct_at (user_id, created_at)
+    ordering = ('-created_at', '-id')
+
+
+class NotificationListView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        return Notification.objects.filter(user_id=self.request.user.pk)
+
+
+class NotificationUnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread_count': get_unread_count(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+class NotificationMarkReadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationMarkReadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = Notification.objects.filter(
+            user_id=request.user.pk,
+            pk__in=serializer.validated_data['ids'],
+            read_status=False,
+        ).update(read_status=True, updated_at=timezone.now())
+        adjust_unread_count(request.user.pk, -updated)
+        return Response({'marked_read': updated}, status=status.HTTP_200_OK)
+
+
+class NotificationMarkAllReadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        updated = Notification.objects.filter(
+            user_id=request.user.pk,
+            read_status=False,
+        ).update(read_status=True, updated_at=timezone.now())
+        reset_unread_count(request.user.pk)
+        return Response({'marked_read': updated}, status=status.HTTP_200_OK)
+
+
+class QuranProgressSyncView(APIView):
+    """Batch upload of pages read offline; re-sent entries are ignored."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = QuranProgressSyncSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = serializer.validated_data['entries']
+        created = ingest_progress(request.user.pk, entries)
+        return Response({
+            'received': len(entries),
+            'created': created,
+            'duplicates': len(entries) - created,
+        }, status=status.HTTP_200_OK)
+
+
+class QuranReadingDaysView(APIView):
+    """Daily reading totals for charts, read from the QuranReadingDay rollup."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = DateRangeSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        end = serializer.validated_data.get('end') or timezone.localdate(timezone=user_zone(request.user.pk))
+        start = serializer.validated_data.get('start') or end - timedelta(days=29)
+        if (end - start).days >= DateRangeSerializer.max_days:
+            start = end - timedelta(days=DateRangeSerializer.max_days - 1)
+        days = QuranReadingDay.objects.filter(
+            user_id=request.user.pk, day__range=(start, end),
+        ).order_by('day')
+        return Response({
+            'start': start,
+            'end': end,
+            'days': QuranReadingDaySerializer(days, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class PrayerLogView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PrayerLogSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        today = timezone.localdate(timezone=user_zone(request.user.pk))
+        day = serializer.validated_data.get('date') or today
+        if day > today:
+            return Response({'date': ['Cannot log prayers for a future date.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = log_prayer(request.user.pk, day, serializer.validated_data['prayer'])
+        return Response(UserPrayerSummarySerializer(summary).data, status=status.HTTP_200_OK)
+
+
+class PrayerHistoryView(APIView):
+    """
+    Prayer calendar for a date range as parallel arrays. ``group=day`` gives
+    one completed-prayer bitmask per logged date (bit i = PRAYERS[i]);
+    ``week``/``month`` read the precomputed period aggregates.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = PrayerHistorySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        end = data.get('end') or timezone.localdate(timezone=user_zone(request.user.pk))
+        start = data.get('start') or end - timedelta(days=29)
+        if (end - start).days >= PrayerHistorySerializer.max_days:
+            start = end - timedelta(days=PrayerHistorySerializer.max_days - 1)
+        group = data['group']
+        payload = {'start': start, 'end': end, 'group': group}
+
+        if group == 'day':
+            rows = UserPrayerSummary.objects.filter(
+                user_id=request.user.pk, date__range=(start, end),
+            ).order_by('date').values_list('date', 'completed_prayers', 'total_points')
+            dates, masks, points = [], [], []
+            for day, prayers, total_points in rows:
+                dates.append(day)
+                masks.append(prayer_mask(prayers or []))
+                points.append(total_points)
+            payload.update(prayers=PRAYERS, dates=dates, masks=masks, points=points)
+        else:
+            rows = UserPrayerPeriodSummary.objects.filter(
+                user_id=request.user.pk, period=group,
+                period_start__range=(period_starts(start)[group], end),
+            ).order_by('period_start').values_list('period_start', 'prayers_completed', 'full_days', 'total_points')
+            columns = list(zip(*rows)) or [(), (), (), ()]
+            payload.update(zip(['period_starts', 'prayers_completed', 'full_days', 'points'], map(list, columns)))
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+class GroupLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, group_id):
+        serializer = LeaderboardQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        by, limit = serializer.validated_data['by'], serializer.validated_data['limit']
+        board = leaderboard_index.ranking(group_id, request.user.pk, by, limit)
+        if board['rank'] is None:
+            raise PermissionDenied('You are not a member of this group.')
+
+        names = dict(UserProfile.objects.filter(
+            user_id__in=[user_id for _, user_id, _, _ in board['top']],
+        ).values_list('user_id', 'name'))
+        streak, pages = board['stats']
+        return Response({
+            'by': by,
+            'member_count': board['member_count'],
+            'average_streak': board['average_streak'],
+            'top': [
+                {
+                    'rank': rank,
+                    'user_id': user_id,
+                    'name': names.get(user_id),
+                    'current_streak': member_streak,
+                    'total_pages_read': member_pages,
+                }
+                for rank, user_id, member_streak, member_pages in board['top']
+            ],
+            'me': {'rank': board['rank'], 'current_streak': streak, 'total_pages_read': pages},
+        }, status=status.HTTP_200_OK)
+
+
+class GroupInviteLookupView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, invite_code):
+        group = group_by_invite_code(invite_code)
+        if group is None:
+            return Response({'detail': 'Invalid invite code.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(group, status=status.HTTP_200_OK)
+
+
+class GroupJoinRequestReviewView(APIView):
+    """Approve or reject many pending join requests at once (group admins only)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = JoinRequestReviewSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        result = review_join_requests(
+            request.user.pk,
+            serializer.validated_data['ids'],
+            approve=serializer.validated_data['action'] == 'approve',
+        )
+        return Response({'action': serializer.validated_data['action'], **result}, status=status.HTTP_200_OK)
+
+
+class QuranMetadataView(APIView):
+    """
+    Chapter or reciter list served from the pre-encoded process snapshot.
+    Public reference data, so no authentication runs for it.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    cache_type = None
+
+    def get(self, request):
+        snapshot = quran_metadata.get(self.cache_type)
+        if etag_matches(request, snapshot.etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(snapshot.body, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        response['Cache-Control'] = f'public, max-age={quran_metadata.max_age}'
+        return response
+
+
+class VerseBookmarkPagination(KeysetPagination):
+    ordering = ('surah_number', 'verse_number', 'id')
+    page_size = 50
+
+
+class VerseBookmarkView(ListAPIView):
+    """List bookmarks in mushaf order, or add one; page_number may be omitted when the verse index knows the page."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = VerseBookmarkSerializer
+    pagination_class = VerseBookmarkPagination
+
+    def get_queryset(self):
+        return VerseBookmark.objects.filter(user_id=self.request.user.pk)
+
+    def post(self, request):
+        serializer = VerseBookmarkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        try:
+            bookmark = serializer.save(user_id=request.user.pk, created_at=now, updated_at=now)
+        except IntegrityError:
+            return Response({'detail': 'This verse is already bookmarked.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(VerseBookmarkSerializer(bookmark).data, status=status.HTTP_201_CREATED)
+
+
+class QuranCoverageView(APIView):
+    """How much of the mushaf the user has read, computed from cached per-page counts."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        counts = get_page_counts(request.user.pk)
+        return Response(summarize(counts, get_quran_index()), status=status.HTTP_200_OK)